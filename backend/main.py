@@ -10,6 +10,9 @@ from .database import init_db, get_db
 from .models import LLMProvider
 from .routers import providers, telegram, home_assistant
 from .services import bot_manager
+from .services.llm_provider import close_http_client
+from .services.log_writer import get_log_writer
+from .services.telegram_bot import close_ha_clients
 from .utils.logger import setup_logging
 import asyncio
 import logging
@@ -81,6 +84,15 @@ async def startup_event():
         db.close()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the bot, flush queued conversation logs and release shared HTTP connections"""
+    await bot_manager.get_bot_manager().cleanup()
+    await get_log_writer().stop()
+    await close_ha_clients()
+    await close_http_client()
+
+
 @app.get("/api/health")
 def health_check():
     """Health check endpoint"""
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
+import asyncio
 import logging
 
 from ..database import get_db
 from ..models import HomeAssistantConfig
 from ..schemas import TestResponse, HomeAssistantConfigResponse, HomeAssistantConfigUpdate
 from ..services import ha_client
+from ..services.telegram_bot import evict_ha_client, invalidate_settings
 
 logger = logging.getLogger(__name__)
 
@@ -38,21 +40,34 @@ def get_ha_config(db: Session = Depends(get_db)):
     return HomeAssistantConfigResponse(**response_data)
 
 @router.put("/config", response_model=HomeAssistantConfigResponse)
-def update_ha_config(config_update: HomeAssistantConfigUpdate, db: Session = Depends(get_db)):
+async def update_ha_config(config_update: HomeAssistantConfigUpdate, db: Session = Depends(get_db)):
     """Update Home Assistant configuration"""
-    config = db.query(HomeAssistantConfig).first()
-    
-    if not config:
-        config = HomeAssistantConfig()
-        db.add(config)
+    def save():
+        """Store the new config (blocking, run via asyncio.to_thread); returns it and the previous credentials"""
+        config = db.query(HomeAssistantConfig).first()
+        
+        if not config:
+            config = HomeAssistantConfig()
+            db.add(config)
+        
+        # Pooled client of the previous config, closed once the new one is saved
+        old_credentials = (config.base_url, config.api_token)
+        
+        # Update fields (dry_run -> dry_run_mode)
+        config.base_url = config_update.base_url
+        config.api_token = config_update.api_token
+        config.dry_run_mode = config_update.dry_run
+        
+        db.commit()
+        db.refresh(config)
+        return config, old_credentials
     
-    # Update fields (dry_run -> dry_run_mode)
-    config.base_url = config_update.base_url
-    config.api_token = config_update.api_token
-    config.dry_run_mode = config_update.dry_run
+    # Only the client eviction needs the event loop; keep the SQLite work off it
+    config, (old_base_url, old_api_token) = await asyncio.to_thread(save)
+    invalidate_settings()
     
-    db.commit()
-    db.refresh(config)
+    if old_base_url and (old_base_url, old_api_token) != (config.base_url, config.api_token):
+        await evict_ha_client(old_base_url, old_api_token)
     
     # Convert to response format
     response_data = {
@@ -77,7 +92,10 @@ async def test_ha_connection(db: Session = Depends(get_db)):
     
     try:
         client = ha_client.HomeAssistantClient(config.base_url, config.api_token)
-        result = await client.test_connection()
+        try:
+            result = await client.test_connection()
+        finally:
+            await client.close()
         return result
     except Exception as e:
         return {
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
+from ..services.telegram_bot import invalidate_settings
 from ..models import LLMProvider, OllamaConfig, OpenAIConfig, GeminiConfig
 from ..schemas import (
     LLMProviderResponse,
@@ -45,6 +46,7 @@ def activate_provider(provider_id: int, db: Session = Depends(get_db)):
     provider.active = True
     provider.enabled = True
     db.commit()
+    invalidate_settings()
     
     return {"message": f"{provider.name} activated", "provider_id": provider_id}
 
@@ -85,6 +87,7 @@ def update_ollama_config(config_update: OllamaConfigUpdate, db: Session = Depend
         setattr(config, key, value)
     
     db.commit()
+    invalidate_settings()
     db.refresh(config)
     return config
 
@@ -147,6 +150,7 @@ def update_openai_config(config_update: OpenAIConfigUpdate, db: Session = Depend
         setattr(config, key, value)
     
     db.commit()
+    invalidate_settings()
     db.refresh(config)
     
     # Mask API key in response
@@ -186,6 +190,7 @@ def update_gemini_config(config_update: GeminiConfigUpdate, db: Session = Depend
         setattr(config, key, value)
     
     db.commit()
+    invalidate_settings()
     db.refresh(config)
     
     # Mask API key in response
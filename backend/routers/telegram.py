@@ -97,7 +97,6 @@ async def update_telegram_config(config_update: TelegramConfigUpdate, db: Sessio
     
     # Store old enabled state to check if we need to restart
     was_enabled = config.enabled
-    old_token = config.bot_token
     
     # Update fields
     config.bot_token = config_update.bot_token
@@ -108,8 +107,8 @@ async def update_telegram_config(config_update: TelegramConfigUpdate, db: Sessio
     db.commit()
     db.refresh(config)
     
-    # Restart bot if config changed and bot is enabled
-    if (was_enabled or config.enabled) and (old_token != config.bot_token or was_enabled != config.enabled):
+    # Apply config to bot (reloads in place when only chat IDs / rate limit changed)
+    if was_enabled or config.enabled:
         try:
             logger.info("Config changed, restarting bot via BotManager...")
             manager = bot_manager.get_bot_manager()
@@ -187,9 +186,9 @@ async def start_telegram_bot(db: Session = Depends(get_db)):
         )
     
     try:
-        # Restart bot with current config using BotManager
+        # Full restart with current config using BotManager (also recovers a stuck updater)
         manager = bot_manager.get_bot_manager()
-        bot = await manager.restart_bot(db)
+        bot = await manager.restart_bot(db, force=True)
         
         if bot:
             return TestResponse(
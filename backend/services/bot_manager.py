@@ -2,12 +2,12 @@
 Bot Manager Service - Manages Telegram bot lifecycle with dependency injection
 """
 from typing import Optional
+import asyncio
 import logging
 from sqlalchemy.orm import Session
 
-from ..database import SessionLocal
 from ..models import TelegramConfig
-from .telegram_bot import TelegramBotService
+from .telegram_bot import TelegramBotService, close_ha_clients, load_telegram_config
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +18,8 @@ class BotManager:
     def __init__(self):
         self._bot_instance: Optional[TelegramBotService] = None
         self._is_running: bool = False
+        # Serializes start/restart/stop so concurrent callers never build two Applications
+        self._lock = asyncio.Lock()
     
     async def get_bot(self, db: Optional[Session] = None) -> Optional[TelegramBotService]:
         """
@@ -29,69 +31,94 @@ class BotManager:
         Returns:
             TelegramBotService instance or None if not configured
         """
+        # Fast path without the lock once the bot is up
         if self._bot_instance and self._is_running:
             return self._bot_instance
         
-        # Use provided session or create new
-        should_close = False
-        if db is None:
-            db = SessionLocal()
-            should_close = True
+        async with self._lock:
+            return await self._get_bot_locked(db)
+    
+    async def _get_bot_locked(self, db: Optional[Session]) -> Optional[TelegramBotService]:
+        """Create and start bot instance if needed (caller holds self._lock)"""
+        # Another caller may have started the bot while we waited for the lock
+        if self._bot_instance and self._is_running:
+            return self._bot_instance
         
-        try:
-            config = db.query(TelegramConfig).first()
-            
-            if not config or not config.enabled or not config.bot_token:
-                logger.info("Bot not configured or disabled")
+        config = await self._load_config(db)
+        
+        if not config or not config.enabled or not config.bot_token:
+            logger.info("Bot not configured or disabled")
+            return None
+        
+        # Create new instance if needed
+        if not self._bot_instance:
+            self._bot_instance = TelegramBotService(config)
+        
+        # Start if not running
+        if not self._is_running:
+            success = await self._bot_instance.start()
+            if success:
+                self._is_running = True
+                logger.info("Bot started successfully via BotManager")
+            else:
+                logger.error("Failed to start bot")
+                self._bot_instance = None
                 return None
-            
-            # Create new instance if needed
-            if not self._bot_instance:
-                self._bot_instance = TelegramBotService(config)
-            
-            # Start if not running
-            if not self._is_running:
-                success = await self._bot_instance.start()
-                if success:
-                    self._is_running = True
-                    logger.info("Bot started successfully via BotManager")
-                else:
-                    logger.error("Failed to start bot")
-                    self._bot_instance = None
-                    return None
-            
-            return self._bot_instance
         
-        finally:
-            if should_close:
-                db.close()
+        return self._bot_instance
     
-    async def restart_bot(self, db: Optional[Session] = None) -> Optional[TelegramBotService]:
+    @staticmethod
+    async def _load_config(db: Optional[Session]) -> Optional[TelegramConfig]:
+        """Load Telegram config in a worker thread (from db if given, else a new session)"""
+        if db is None:
+            return await asyncio.to_thread(load_telegram_config)
+        return await asyncio.to_thread(lambda: db.query(TelegramConfig).first())
+    
+    async def restart_bot(self, db: Optional[Session] = None, force: bool = False) -> Optional[TelegramBotService]:
         """
         Restart bot with fresh config
         
         Args:
             db: Optional database session
+            force: Always rebuild the Application (e.g. to recover a stuck updater),
+                even when the config could be reloaded in place
         
         Returns:
             TelegramBotService instance or None
         """
         logger.info("Restarting bot via BotManager...")
         
-        # Stop current instance
-        await self.stop_bot()
-        
-        # Get fresh instance
-        return await self.get_bot(db)
+        async with self._lock:
+            # Same token: apply config in place, no Application teardown
+            if not force and self._bot_instance and self._is_running:
+                config = await self._load_config(db)
+                if config and config.enabled and config.bot_token and self._bot_instance.reload_config(config):
+                    logger.info("Bot config reloaded via BotManager")
+                    return self._bot_instance
+            
+            # Stop current instance and drop it so the new token/config is used
+            await self._stop_bot_locked()
+            self._bot_instance = None
+            
+            # Drop pooled HA connections so new config is picked up cleanly
+            await close_ha_clients()
+            
+            # Get fresh instance
+            return await self._get_bot_locked(db)
     
     async def stop_bot(self):
         """Stop bot instance"""
+        async with self._lock:
+            await self._stop_bot_locked()
+    
+    async def _stop_bot_locked(self):
+        """Stop bot instance (caller holds self._lock)"""
         if self._bot_instance and self._is_running:
             try:
                 await self._bot_instance.stop()
                 logger.info("Bot stopped via BotManager")
             except Exception as e:
-                logger.error(f"Error stopping bot: {e}")
+                logger.error("Error stopping bot: %s", e)
             finally:
                 self._is_running = False
                 # Keep instance for potential restart
@@ -102,8 +129,9 @@ class BotManager:
     
     async def cleanup(self):
         """Cleanup resources"""
-        await self.stop_bot()
-        self._bot_instance = None
+        async with self._lock:
+            await self._stop_bot_locked()
+            self._bot_instance = None
 
 
 # Global bot manager instance
@@ -3,12 +3,53 @@ Entity cache for Home Assistant entities
 Caches entity list to avoid frequent API calls
 """
 import logging
+import re
 import time
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, NamedTuple, Tuple, Set, FrozenSet
 from datetime import datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Word splitter for entity name tokens (underscores split too: salon_isik -> salon, isik)
+_WORD_RE = re.compile(r'[^\W_]+')
+
+# Shortest name word that is indexed / message word that is looked up
+_MIN_TOKEN_LEN = 3
+
+# Final consonants (after fold_text) that soften before a Turkish suffix (ışık -> ışığı, dolap -> dolabı)
+_SOFTENING_FINALS = ("p", "c", "t", "k")
+
+# Turkish inflectional suffixes after fold_text (vowel harmony collapses to a/e and i/u); a stem followed
+# only by these is an inflected form of it (kapa -> kapatır, aç -> açabilir, değer -> değerini)
+_SUFFIX_RE = re.compile(
+    r"(?:l[ae]r|[dt][ae]n?|n?[iu]n|y?[ae]bil|[iu]?yor|y?[ae]c[ae]k|m[iu]s|[dt][iu]r?|s[ae]n[ae]|s[iu]n?"
+    r"|y?[iu]m|y?[iu]z|m[ae]|y?l[ae]|[aeiu]?r|y?[aeiu]|n|t)+"
+)
+
+# Turkish letters folded to ASCII so "Işık", "ışık" and object ID "isik" compare equal
+_FOLD_TABLE = str.maketrans("İIıŞşÇçĞğÖöÜü", "iiissccggoouu")
+
+
+def fold_text(text: str) -> str:
+    """Lowercase text for name-word matching, folding Turkish letters to ASCII"""
+    return text.translate(_FOLD_TABLE).lower()
+
+
+def is_inflection(token: str, stem: str) -> bool:
+    """Check if folded token is stem itself or stem followed only by Turkish suffixes (thermostat is not "the")"""
+    return token == stem or (token.startswith(stem) and _SUFFIX_RE.fullmatch(token, len(stem)) is not None)
+
+
+class EntityRecord(NamedTuple):
+    """Derived per-entity fields, computed once when the cache is set"""
+    entity_id: str
+    entity_id_lower: str
+    domain: str
+    friendly_name: str
+    friendly_name_lower: str
+    state: str
+    unit: str
+
 
 class EntityCache:
     """Cache for Home Assistant entities"""
@@ -17,6 +58,18 @@ class EntityCache:
         self.cache: Optional[List[Dict[str, Any]]] = None
         self.cache_time: Optional[datetime] = None
         self.ttl_seconds = ttl_seconds
+        self.version = 0  # bumped on every set/clear so derived caches can invalidate
+        # Lookup indexes: lowercased entity_id -> entity, lowercased friendly_name -> entity_id
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_name: Dict[str, str] = {}
+        # Precomputed records, parallel to cache
+        self.records: List[EntityRecord] = []
+        # Fuzzy matching choices per domain: domain -> (lowercased object IDs, entity IDs), parallel lists
+        self.fuzzy_choices: Dict[str, Tuple[List[str], List[str]]] = {}
+        # Folded words (3+ chars, see fold_text) from friendly names and entity object IDs -> record indexes
+        self.token_index: Dict[str, List[int]] = {}
+        # Set once a device was commanded; cached states may be outdated until the next set()
+        self.states_changed = False
     
     def is_valid(self) -> bool:
         """Check if cache is still valid"""
@@ -36,31 +89,150 @@ class EntityCache:
         """Set cached entities"""
         self.cache = entities
         self.cache_time = datetime.now()
-        logger.info(f"Cached {len(entities)} entities")
+        self.version += 1
+        self.states_changed = False
+        self._build_indexes(entities)
+        logger.info("Cached %s entities", len(entities))
     
     def clear(self):
         """Clear cache"""
         self.cache = None
         self.cache_time = None
+        self.version += 1
+        self.by_id = {}
+        self.by_name = {}
+        self.records = []
+        self.fuzzy_choices = {}
+        self.token_index = {}
+        self.states_changed = False
+    
+    def _build_indexes(self, entities: List[Dict[str, Any]]):
+        """Build records, lookup indexes and fuzzy-match choice lists from entities"""
+        records = []
+        by_id = {}
+        by_name = {}
+        for entity in entities:
+            entity_id = entity.get("entity_id", "")
+            attributes = entity.get("attributes", {})
+            friendly_name = attributes.get("friendly_name", "")
+            domain, sep, _ = entity_id.partition(".")
+            record = EntityRecord(
+                entity_id=entity_id,
+                entity_id_lower=entity_id.lower(),
+                domain=domain if sep else "unknown",
+                friendly_name=friendly_name,
+                friendly_name_lower=friendly_name.lower(),
+                state=entity.get("state", "unknown"),
+                unit=attributes.get("unit_of_measurement", "") or "",
+            )
+            records.append(record)
+            by_id[record.entity_id_lower] = entity
+            if friendly_name:
+                by_name.setdefault(record.friendly_name_lower, entity_id)
+        self.records = records
+        self.by_id = by_id
+        self.by_name = by_name
+        fuzzy_choices: Dict[str, Tuple[List[str], List[str]]] = {}
+        token_index: Dict[str, List[int]] = {}
+        for i, record in enumerate(records):
+            object_id = record.entity_id_lower.partition(".")[2]
+            object_ids, entity_ids = fuzzy_choices.setdefault(record.domain, ([], []))
+            object_ids.append(object_id)
+            entity_ids.append(record.entity_id)
+            for token in set(_WORD_RE.findall(fold_text(f"{object_id} {record.friendly_name}"))):
+                if len(token) < _MIN_TOKEN_LEN:
+                    continue
+                token_index.setdefault(token, []).append(i)
+                # Also index the stem a suffixed form starts with (ışık -> ışı matches ışığı)
+                if len(token) > _MIN_TOKEN_LEN and token.endswith(_SOFTENING_FINALS):
+                    token_index.setdefault(token[:-1], []).append(i)
+        self.fuzzy_choices = fuzzy_choices
+        self.token_index = token_index
+    
+    def invalidate_states(self):
+        """Make get_entity(max_age=...) miss until the next set() (call after changing a device's state)"""
+        self.states_changed = True
+    
+    def get_entity(self, entity_id: str, max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get cached entity by ID
+        
+        Args:
+            entity_id: Entity ID (case-insensitive)
+            max_age: Optional max cache age in seconds (stricter than TTL); with max_age,
+                states invalidated by invalidate_states() are not returned either
+        
+        Returns:
+            Entity state dict or None if not cached / too old
+        """
+        if not self.is_valid():
+            return None
+        if max_age is not None and (self.states_changed or (datetime.now() - self.cache_time).total_seconds() > max_age):
+            return None
+        return self.by_id.get(entity_id.lower())
+    
+    def _match_token(self, token: str) -> Set[int]:
+        """Get indexes of records with a name word that token starts with (suffixed forms: kombiyi -> kombi)"""
+        token_index = self.token_index
+        indexes: Set[int] = set()
+        for end in range(_MIN_TOKEN_LEN, len(token) + 1):
+            indexes.update(token_index.get(token[:end], ()))
+        return indexes
+    
+    def mentions_entity(self, text: str) -> bool:
+        """Check if text contains any word of a cached entity name (works on stale cache too)"""
+        if not self.token_index:
+            return False
+        return any(self._match_token(token) for token in _WORD_RE.findall(fold_text(text)) if len(token) >= _MIN_TOKEN_LEN)
+    
+    def match_records(
+        self,
+        text: str,
+        ignore_words: FrozenSet[str] = frozenset(),
+        ignore_stems: Tuple[str, ...] = ()
+    ) -> List[EntityRecord]:
+        """
+        Get records whose name words appear in text (also as suffixed forms)
+        
+        Args:
+            text: Free text (e.g. user message)
+            ignore_words: Folded words (see fold_text) that may match no entity as they are
+                (particles, English words)
+            ignore_stems: Folded stems that may match no entity, also with Turkish suffixes
+                (verbs: kapa matches kapat, kapatır)
+        
+        Returns:
+            Matching records in cache order; empty if nothing matches or if another word
+            matches no entity, since that word may name an entity the index cannot find
+        """
+        indexes: Set[int] = set()
+        for token in _WORD_RE.findall(fold_text(text)):
+            if len(token) < _MIN_TOKEN_LEN:
+                continue
+            matched = self._match_token(token)
+            if matched:
+                indexes.update(matched)
+            elif token not in ignore_words and not any(is_inflection(token, stem) for stem in ignore_stems):
+                return []
+        records = self.records
+        return [records[i] for i in sorted(indexes)]
     
     def get_entity_list_for_prompt(self, domain: Optional[str] = None) -> str:
         """Get formatted entity list for LLM prompt"""
         if not self.is_valid() or not self.cache:
             return "Entity list not available"
         
-        entities = self.cache
+        records = self.records
         if domain:
-            entities = [e for e in entities if e.get("entity_id", "").startswith(f"{domain}.")]
+            records = [r for r in records if r.domain == domain]
         
         # Format: entity_id (friendly_name)
         formatted = []
-        for entity in entities[:100]:  # Limit to 100 entities
-            entity_id = entity.get("entity_id", "")
-            friendly_name = entity.get("attributes", {}).get("friendly_name", "")
-            if friendly_name:
-                formatted.append(f"{entity_id} ({friendly_name})")
+        for record in records[:100]:  # Limit to 100 entities
+            if record.friendly_name:
+                formatted.append(f"{record.entity_id} ({record.friendly_name})")
             else:
-                formatted.append(entity_id)
+                formatted.append(record.entity_id)
         
         return "\n".join(formatted) if formatted else "No entities found"
 
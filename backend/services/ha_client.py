@@ -18,29 +18,42 @@ class HomeAssistantClient:
             self.headers["Authorization"] = f"Bearer {api_token}"
         
         self.headers["Content-Type"] = "application/json"
+        
+        # Single pooled HTTP client, created lazily and reused across calls
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get shared HTTP client (keeps connections alive between calls)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(headers=self.headers)
+        return self._client
+    
+    async def close(self):
+        """Close the underlying HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def test_connection(self) -> TestResponse:
         """Test HA connection"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/",
-                    headers=self.headers,
-                    timeout=5.0
+            response = await self._get_client().get(
+                f"{self.base_url}/api/",
+                timeout=5.0
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return TestResponse(
+                    success=True,
+                    message="Home Assistant connection successful",
+                    details={"message": data.get("message")}
+                )
+            else:
+                return TestResponse(
+                    success=False,
+                    message=f"HTTP {response.status_code}"
                 )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return TestResponse(
-                        success=True,
-                        message="Home Assistant connection successful",
-                        details={"message": data.get("message")}
-                    )
-                else:
-                    return TestResponse(
-                        success=False,
-                        message=f"HTTP {response.status_code}"
-                    )
         except Exception as e:
             return TestResponse(
                 success=False,
@@ -49,19 +62,18 @@ class HomeAssistantClient:
     
     async def get_states(self, entity_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get entity states"""
-        async with httpx.AsyncClient() as client:
-            if entity_id:
-                url = f"{self.base_url}/api/states/{entity_id}"
-            else:
-                url = f"{self.base_url}/api/states"
-            
-            response = await client.get(url, headers=self.headers, timeout=10.0)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return [data] if entity_id else data
-            else:
-                raise Exception(f"HA API error: {response.status_code}")
+        if entity_id:
+            url = f"{self.base_url}/api/states/{entity_id}"
+        else:
+            url = f"{self.base_url}/api/states"
+        
+        response = await self._get_client().get(url, timeout=10.0)
+        
+        if response.status_code == 200:
+            data = response.json()
+            return [data] if entity_id else data
+        else:
+            raise Exception(f"HA API error: {response.status_code}")
     
     async def call_service(
         self,
@@ -76,18 +88,16 @@ class HomeAssistantClient:
         if entity_id:
             service_data["entity_id"] = entity_id
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/api/services/{domain}/{service}",
-                headers=self.headers,
-                json=service_data,
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                raise Exception(f"HA service call failed: {response.status_code}")
+        response = await self._get_client().post(
+            f"{self.base_url}/api/services/{domain}/{service}",
+            json=service_data,
+            timeout=10.0
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"HA service call failed: {response.status_code}")
     
     async def turn_on(self, entity_id: str) -> Dict[str, Any]:
         """Turn on entity"""
@@ -116,7 +126,7 @@ class HomeAssistantClient:
                 return [s for s in states if s.get("entity_id", "").startswith(f"{domain}.")]
             return states
         except Exception as e:
-            logger.error(f"Error getting entities: {e}")
+            logger.error("Error getting entities: %s", e)
             return []
     
     async def search_entities(self, query: str, domain: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -141,20 +151,18 @@ class HomeAssistantClient:
     async def get_services(self) -> Dict[str, List[Dict[str, Any]]]:
         """Get all available services from Home Assistant"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/api/services",
-                    headers=self.headers,
-                    timeout=10.0
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.warning(f"Failed to get services: {response.status_code}")
-                    return {}
+            response = await self._get_client().get(
+                f"{self.base_url}/api/services",
+                timeout=10.0
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                logger.warning("Failed to get services: %s", response.status_code)
+                return {}
         except Exception as e:
-            logger.error(f"Error getting services: {e}")
+            logger.error("Error getting services: %s", e)
             return {}
     
     async def get_entity_info(self, entity_id: str) -> Optional[Dict[str, Any]]:
@@ -179,7 +187,7 @@ class HomeAssistantClient:
                 "unit_of_measurement": attributes.get("unit_of_measurement"),
             }
         except Exception as e:
-            logger.error(f"Error getting entity info for {entity_id}: {e}")
+            logger.error("Error getting entity info for %s: %s", entity_id, e)
             return None
     
     async def get_entity_state(self, entity_id: str) -> Optional[str]:
@@ -188,5 +196,5 @@ class HomeAssistantClient:
             info = await self.get_entity_info(entity_id)
             return info.get("state") if info else None
         except Exception as e:
-            logger.error(f"Error getting entity state for {entity_id}: {e}")
+            logger.error("Error getting entity state for %s: %s", entity_id, e)
             return None
@@ -1,13 +1,38 @@
 from abc import ABC, abstractmethod
 from typing import Optional, Dict, Any
+import httpx
 from sqlalchemy.orm import Session
 from ..models import LLMProvider, OllamaConfig, OpenAIConfig, GeminiConfig
 from ..database import get_db
 
 
+# Shared HTTP client for provider calls so keep-alive connections survive across messages
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get shared HTTP client (created lazily, recreated if closed)"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close shared HTTP client"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
 class BaseLLMProvider(ABC):
     """Base class for LLM providers"""
     
+    name: str = ""  # LLMProvider.name this class serves
+    
     @abstractmethod
     async def generate(self, prompt: str, context: Optional[str] = None) -> str:
         """Generate response from LLM"""
@@ -22,13 +47,13 @@ class BaseLLMProvider(ABC):
 class OllamaProvider(BaseLLMProvider):
     """Ollama LLM Provider"""
     
+    name = "ollama"
+    
     def __init__(self, config: OllamaConfig):
         self.config = config
     
     async def generate(self, prompt: str, context: Optional[str] = None) -> str:
         """Generate response using Ollama"""
-        import httpx
-        
         messages = []
         if context:
             messages.append({"role": "system", "content": context})
@@ -36,49 +61,48 @@ class OllamaProvider(BaseLLMProvider):
             messages.append({"role": "system", "content": self.config.system_prompt})
         messages.append({"role": "user", "content": prompt})
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.config.base_url}/api/chat",
-                json={
-                    "model": self.config.model,
-                    "messages": messages,
-                    "temperature": self.config.temperature,
-                    "stream": False,
-                    "options": {
-                        "num_predict": self.config.max_tokens
-                    }
-                },
-                timeout=30.0
+        response = await _get_http_client().post(
+            f"{self.config.base_url}/api/chat",
+            json={
+                "model": self.config.model,
+                "messages": messages,
+                "temperature": self.config.temperature,
+                "stream": False,
+                "options": {
+                    "num_predict": self.config.max_tokens
+                }
+            },
+            timeout=30.0
+        )
+        
+        if response.status_code == 200:
+            result = response.json()
+            return result.get("message", {}).get("content", "")
+        else:
+            # HTTPStatusError carries the status, so 4xx (e.g. unknown model) is not retried
+            raise httpx.HTTPStatusError(
+                f"Ollama API error: {response.status_code}", request=response.request, response=response
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("message", {}).get("content", "")
-            else:
-                raise Exception(f"Ollama API error: {response.status_code}")
     
     async def test_connection(self) -> Dict[str, Any]:
         """Test Ollama connection"""
-        import httpx
-        
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.config.base_url}/api/version",
-                    timeout=5.0
-                )
-                
-                if response.status_code == 200:
-                    return {
-                        "success": True,
-                        "message": "Connection successful",
-                        "details": response.json()
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "message": f"HTTP {response.status_code}"
-                    }
+            response = await _get_http_client().get(
+                f"{self.config.base_url}/api/version",
+                timeout=5.0
+            )
+            
+            if response.status_code == 200:
+                return {
+                    "success": True,
+                    "message": "Connection successful",
+                    "details": response.json()
+                }
+            else:
+                return {
+                    "success": False,
+                    "message": f"HTTP {response.status_code}"
+                }
         except Exception as e:
             return {
                 "success": False,
@@ -89,6 +113,8 @@ class OllamaProvider(BaseLLMProvider):
 class OpenAIProvider(BaseLLMProvider):
     """OpenAI LLM Provider"""
     
+    name = "openai"
+    
     def __init__(self, config: OpenAIConfig):
         self.config = config
     
@@ -146,6 +172,8 @@ class OpenAIProvider(BaseLLMProvider):
 class GeminiProvider(BaseLLMProvider):
     """Google Gemini LLM Provider"""
     
+    name = "gemini"
+    
     def __init__(self, config: GeminiConfig):
         self.config = config
     
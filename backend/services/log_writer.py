@@ -0,0 +1,126 @@
+"""
+Conversation log writer - batches ConversationLog inserts off the message path
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+from sqlalchemy import insert
+
+from ..database import SessionLocal
+from ..models import ConversationLog
+
+logger = logging.getLogger(__name__)
+
+# Max rows written in one insert
+_BATCH_SIZE = 100
+
+# How long (seconds) the writer waits for more rows after the first one
+_BATCH_INTERVAL = 0.5
+
+# Max queued rows; further logs are dropped instead of growing memory
+_QUEUE_MAX = 10000
+
+
+class ConversationLogWriter:
+    """Queues conversation logs and inserts them in batches from a background task"""
+    
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: List[Dict[str, Any]] = []  # rows taken from the queue but not yet handed to _insert
+        self._accepting = False  # False before start() and after stop(); enqueue() drops rows then
+    
+    def start(self):
+        """Start background writer task (no-op if already running)"""
+        self._accepting = True
+        if self._task and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=_QUEUE_MAX)
+        self._task = asyncio.create_task(self._drain())
+        logger.info("Conversation log writer started")
+    
+    async def stop(self):
+        """Stop background writer task and write rows still queued (no-op if not running)"""
+        was_running = self._accepting or self._task is not None
+        self._accepting = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        rows, self._pending = self._pending, []
+        while self._queue and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        if rows:
+            await self._write(rows)
+        if was_running:
+            logger.info("Conversation log writer stopped")
+    
+    def enqueue(self, chat_id: str, user_message: str, bot_response: str, llm_provider: Optional[str]):
+        """
+        Queue conversation log row (dropped with a warning if the writer is not running)
+        
+        Args:
+            chat_id: Telegram chat ID
+            user_message: Incoming message text
+            bot_response: Sent response text
+            llm_provider: Name of the provider that answered
+        """
+        if not self._accepting:
+            logger.warning("Conversation log writer not running, dropping log for chat %s", chat_id)
+            return
+        try:
+            self._queue.put_nowait({
+                "chat_id": chat_id,
+                "user_message": user_message,
+                "bot_response": bot_response,
+                "llm_provider": llm_provider,
+                "timestamp": datetime.now(timezone.utc),
+            })
+        except asyncio.QueueFull:
+            logger.warning("Conversation log queue full, dropping log for chat %s", chat_id)
+    
+    async def _drain(self):
+        """Collect queued rows into batches and write them"""
+        while True:
+            self._pending.append(await self._queue.get())
+            await asyncio.sleep(_BATCH_INTERVAL)
+            while len(self._pending) < _BATCH_SIZE and not self._queue.empty():
+                self._pending.append(self._queue.get_nowait())
+            
+            rows, self._pending = self._pending, []
+            await self._write(rows)
+    
+    async def _write(self, rows: List[Dict[str, Any]]):
+        """Insert rows in a worker thread, logging (never raising) failures"""
+        try:
+            await asyncio.to_thread(self._insert, rows)
+        except Exception as e:
+            logger.error("Failed to write %s conversation logs: %s", len(rows), e)
+    
+    @staticmethod
+    def _insert(rows: List[Dict[str, Any]]):
+        """Insert rows in one statement (blocking, run via asyncio.to_thread)"""
+        db = SessionLocal()
+        try:
+            db.execute(insert(ConversationLog), rows)
+            db.commit()
+        finally:
+            db.close()
+
+
+# Global writer instance
+_log_writer: Optional[ConversationLogWriter] = None
+
+
+def get_log_writer() -> ConversationLogWriter:
+    """Get global conversation log writer"""
+    global _log_writer
+    if _log_writer is None:
+        _log_writer = ConversationLogWriter()
+    return _log_writer
@@ -0,0 +1,73 @@
+"""
+Response cache for LLM replies to repeated messages
+Skips the LLM call when a chat resends the same plain-chat message
+"""
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Exact-match cache of LLM responses keyed by (chat_id, normalized message)"""
+    
+    def __init__(self, ttl_seconds: int = 300, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        # (chat_id, normalized message) -> (stored_at, response, provider name), least recently used first
+        self._entries: OrderedDict[Tuple[str, str], Tuple[float, str, Optional[str]]] = OrderedDict()
+    
+    @staticmethod
+    def _normalize(message: str) -> str:
+        """Lowercase and collapse whitespace so trivial variations share an entry"""
+        return " ".join(message.lower().split())
+    
+    def get(self, chat_id: str, message: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get cached response
+        
+        Args:
+            chat_id: Telegram chat ID
+            message: User message
+        
+        Returns:
+            (cached response, name of the provider that generated it) or None if missing / expired
+        """
+        key = (chat_id, self._normalize(message))
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        stored_at, response, provider = entry
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return response, provider
+    
+    def put(self, chat_id: str, message: str, response: str, provider: Optional[str] = None):
+        """Cache response (and the provider that generated it) for chat and message, evicting the least recently used entry when full"""
+        key = (chat_id, self._normalize(message))
+        self._entries[key] = (time.monotonic(), response, provider)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Clear cache"""
+        self._entries.clear()
+
+
+# Global cache instance
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get global response cache instance"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -1,21 +1,390 @@
 from telegram import Update
-from telegram.ext import Application, MessageHandler, filters, ContextTypes
+from telegram.error import BadRequest, Forbidden, InvalidToken, NetworkError, RetryAfter
+from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters, ContextTypes
 from sqlalchemy.orm import Session
+from rapidfuzz import process, fuzz, utils as fuzz_utils
+import asyncio
 import logging
-from typing import Optional, Dict, Any, Tuple
+import math
+import orjson
+from typing import Optional, Dict, Any, Tuple, List, FrozenSet, Awaitable
 import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from types import MappingProxyType
 
 from ..database import get_db, SessionLocal
-from ..models import TelegramConfig, ConversationLog, LLMProvider, HomeAssistantConfig
-from .llm_provider import LLMProviderFactory
+from ..models import TelegramConfig, HomeAssistantConfig
+from .llm_provider import LLMProviderFactory, BaseLLMProvider
+from .log_writer import get_log_writer
+from .response_cache import get_response_cache
 from .ha_client import HomeAssistantClient
-from .entity_cache import get_entity_cache
-from ..utils.rate_limiter import RateLimiter
+from .entity_cache import get_entity_cache, EntityRecord, fold_text
+from ..utils.rate_limiter import RateLimiter, OutboundLimiter
 from ..utils.retry import retry_async
+from ..utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from ..utils.question_detector import QuestionDetector
 
 logger = logging.getLogger(__name__)
 
+# Cheap prefilter for messages that may need Home Assistant context (prefix match on keywords)
+_LOOKS_HA_RELATED_RE = re.compile(
+    r'\b(aç|kapa|ışık|lamba|klima|termostat|petek|kombi|derece|sıcaklı|nem|perde|kilit|'
+    r'oda|salon|mutfak|banyo|durum|light|switch|climate|sensor|cover|lock|fan|temperature)',
+    re.IGNORECASE
+)
+
+# Message words that name no entity (verbs, particles, question words); any other word
+# that matches no entity makes the prompt list all entities. Stems also match their suffixed
+# forms (kapa -> kapatır), words only match as they are (so "the" does not swallow "thermostat").
+_NON_ENTITY_STEMS = tuple(fold_text(word) for word in (
+    "aç", "kapa", "yak", "söndür", "ayarla", "yap", "getir", "göster", "rica",
+    "nasıl", "kaç", "hangi", "durum", "değer", "derece", "yüzde", "hepsi",
+))
+_NON_ENTITY_WORDS = frozenset(fold_text(word) for word in (
+    "lütfen", "mısın", "misin", "musun", "müsün", "nedir", "neden", "niye", "var", "yok",
+    "ile", "için", "şimdi", "hemen", "tüm", "bütün", "biraz", "daha",
+    "state", "turn", "set", "the", "and", "please",
+))
+
+# Placeholders in LLM answers that get replaced with the real state value
+_STATE_BOLD_RE = re.compile(r'\*\*[\d.]+\*\*')
+_STATE_UNIT_RE = re.compile(r'[\d.]+(?=\s*(derece|°|%))')
+
+# Chat IDs inside the stored JSON array (negative for groups)
+_CHAT_ID_RE = re.compile(r'-?\d+')
+
+# LLM-emitted Home Assistant command marker (followed by a JSON object)
+_HA_COMMAND_MARKER = "HA_COMMAND:"
+
+# HA_COMMAND fields that must be strings when present
+_HA_COMMAND_STR_FIELDS = ("type", "entity_id", "domain", "service", "action")
+
+# Errors that will not go away on retry (bad input, programming errors)
+_PERMANENT_ERRORS = (KeyError, ValueError, TypeError, AttributeError)
+
+# Telegram send errors that will not go away on retry (BadRequest is a NetworkError subclass in PTB)
+_PERMANENT_SEND_ERRORS = (BadRequest, Forbidden, InvalidToken)
+
+
+@lru_cache(maxsize=1024)
+def _classify_message(message: str) -> Tuple[bool, bool]:
+    """Classify message as (requires state read, is question); memoized since users often resend messages"""
+    is_question, is_state_query = QuestionDetector.classify(message)
+    return is_question and is_state_query, is_question
+
+
+def _http_status(exc: Exception) -> Optional[int]:
+    """Get HTTP status code carried by a provider error (httpx, OpenAI and Google API errors), if any"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(exc, "code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transient_error(exc: Exception) -> bool:
+    """Check if exception is worth retrying (4xx responses other than 429 are permanent)"""
+    if isinstance(exc, _PERMANENT_ERRORS):
+        return False
+    status = _http_status(exc)
+    return status is None or status == 429 or not 400 <= status < 500
+
+
+def _is_transient_send_error(exc: Exception) -> bool:
+    """Check if Telegram send error is worth retrying"""
+    return not isinstance(exc, _PERMANENT_SEND_ERRORS)
+
+
+def _extract_ha_command(text: str) -> Tuple[str, Optional[str]]:
+    """
+    Split LLM response into (text before HA_COMMAND marker, JSON object string)
+    
+    Single pass: finds the marker, then walks from the first '{' tracking brace
+    depth (ignoring braces inside string literals) to the matching '}'.
+    Returns (text, None) if there is no marker or no complete JSON object.
+    """
+    idx = text.find(_HA_COMMAND_MARKER)
+    if idx < 0:
+        return text, None
+    
+    start = text.find("{", idx + len(_HA_COMMAND_MARKER))
+    if start < 0:
+        return text, None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for pos in range(start, len(text)):
+        char = text[pos]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return text[:idx].rstrip(), text[start:pos + 1]
+    
+    return text, None
+
+
+def _validate_ha_command(command: Any) -> Dict[str, Any]:
+    """
+    Check parsed HA_COMMAND JSON shape and fill defaults
+    
+    Args:
+        command: Parsed JSON value
+    
+    Returns:
+        Command dict with type, entity_id and data always set
+    
+    Raises:
+        ValueError: If command is not an object or a field has the wrong type
+    """
+    if not isinstance(command, dict):
+        raise ValueError(f"HA command must be an object, got {type(command).__name__}")
+    
+    for field in _HA_COMMAND_STR_FIELDS:
+        value = command.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"HA command field '{field}' must be a string")
+    
+    data = command.get("data")
+    if data is None:
+        command["data"] = {}
+    elif not isinstance(data, dict):
+        raise ValueError("HA command field 'data' must be an object")
+    
+    entities = command.get("entities")
+    if entities is not None and not (isinstance(entities, list) and all(isinstance(e, str) for e in entities)):
+        raise ValueError("HA command field 'entities' must be a list of strings")
+    
+    command["type"] = command.get("type") or "service"
+    command.setdefault("entity_id", None)
+    return command
+
+
+# Action to service mapping for generic service calls
+# Maps user-friendly actions to HA service names
+_ACTION_TO_SERVICE = MappingProxyType({
+    "on": "turn_on",
+    "off": "turn_off",
+    "set_temperature": "set_temperature",
+    "set_brightness": "turn_on",  # brightness is a parameter
+    "set_color": "turn_on",  # color is a parameter
+    "toggle": "toggle",
+    "open": "open_cover",
+    "close": "close_cover",
+    "stop": "stop_cover",
+    "lock": "lock",
+    "unlock": "unlock",
+})
+
+# Domains whose services are listed in the LLM prompt
+_COMMON_DOMAINS = ("light", "switch", "climate", "cover", "lock", "group", "fan", "media_player")
+
+# Leading verbs of natural-language HA commands
+_HA_VERB_SET = frozenset({"aç", "kapat", "set", "turn"})
+
+# Minimum RapidFuzz ratio score (0-100) for a fuzzy entity match; only near-identical
+# object IDs qualify so a missing entity is never swapped for a different device
+_FUZZY_SCORE_CUTOFF = 90
+
+# How long (seconds) the formatted HA service list is reused
+_SERVICES_TTL = 300
+
+# How long (seconds) loaded HA settings and LLM provider are reused across messages
+_SETTINGS_TTL = 30
+
+# Max entity cache age (seconds) for answering get_state without calling HA
+_STATE_MAX_AGE = 10
+
+# Max remembered _find_entity lookups (per entity cache version)
+_FIND_CACHE_SIZE = 256
+
+# Max entities listed in the LLM prompt
+_PROMPT_ENTITY_LIMIT = 100
+
+# Max updates processed at once (across chats; each chat runs one update at a time)
+_MAX_CONCURRENT_UPDATES = 256
+
+# Wall-clock budget (seconds) for scheduling LLM generation retries
+_LLM_RETRY_BUDGET = 3.0
+
+# Sent while the LLM provider circuit breaker is open
+_LLM_DEGRADED_MESSAGE = "⚠️ Yapay zeka servisi şu anda yanıt vermiyor. Lütfen biraz sonra tekrar deneyin."
+
+# Sent to private chats that are not in allowed_chat_ids
+_UNAUTHORIZED_MESSAGE = "❌ Bu bot sizin için yetkilendirilmemiş."
+
+# /start reply
+_HELP_TEXT = """
+👋 Merhaba! Ben akıllı ev asistanınızım.
+
+📝 Kullanabileceğiniz komutlar:
+
+**LLM Chat:**
+• Herhangi bir soru sorun, cevap vereceğim
+• Doğal dil komutlarınızı anlayabilirim
+
+**Home Assistant Komutları:**
+• "Salon ışıklarını aç" - LLM entity'leri bulur ve açar
+• "Yatak odasını kapat" - LLM entity'leri bulur ve kapatır
+• "Odayı 22 dereceye ayarla" - LLM termostat'ı ayarlar
+
+💡 Örnekler:
+• "Bugün hava nasıl?" - LLM cevap verir
+• "Salon ışıklarını aç" - HA komutu gönderir
+• "Odayı 22 dereceye ayarla" - HA komutu gönderir
+
+🔧 Ayarlar:
+• Bot Admin Panel: http://192.168.7.62:8000
+• LLM Provider: Ollama/OpenAI/Gemini seçebilirsiniz
+• Chat ID'leri: Admin panel'den yönetebilirsiniz
+"""
+
+# LLM system prompt; {entity_list} and {services_info} are filled per message (literal braces doubled)
+_SYSTEM_PROMPT_TEMPLATE = """
+Sen bir akıllı ev asistanısın. Kullanıcının mesajını anla ve Home Assistant komutlarını doğru formatta üret.
+
+**Mevcut Home Assistant Entity'leri ve Durumları:**
+(Her [domain] başlığı altında satır formatı: entity_id|isim|durum)
+{entity_list}
+
+**Mevcut Service'ler:**
+{services_info}
+
+**ÖNEMLİ KURALLAR:**
+
+1. **Soru Tespiti (ÇOK ÖNEMLİ!):**
+   - Kullanıcı soru soruyorsa (?, kaç, nedir, açık mı, kapalı mı, merak ediyorum) → MUTLAKA type: "get_state" kullan
+   - "Açık mı?", "Kaç derece?", "Nedir?", "Merak ediyorum" gibi sorular için service çağrısı YAPMA, sadece state oku
+   - SORU SORULUYORSA: {{"type": "get_state", "entity_id": "..."}} formatını kullan
+   - ASLA "get_temperature", "update", "read" gibi action'lar kullanma - sadece "get_state"!
+
+2. **Entity Seçimi:**
+   - Entity ID'leri yukarıdaki listeden tam olarak kullan
+   - Entity'nin mevcut state'ini kontrol et (yukarıdaki listede var)
+   - Group entity'ler için group domain service'lerini kullan (örn: group.turn_on, group.turn_off)
+
+3. **Service Seçimi:**
+   - Her entity'nin domain'ini belirle (light, switch, climate, sensor, cover, lock, group, vb.)
+   - Yukarıdaki service listesinden doğru service'i seç
+   - Group entity'ler için group domain service'lerini kullan
+
+4. **Format:**
+   - İşlem yapılacaksa: {{"type": "service", "domain": "light", "service": "turn_on", "entity_id": "light.salon", "data": {{}}}}
+   - State okunacaksa: {{"type": "get_state", "entity_id": "sensor.salon_sicaklik"}}
+
+**Örnekler:**
+- "Salon ışıklarını aç" → HA_COMMAND: {{"type": "service", "domain": "light", "service": "turn_on", "entity_id": "light.salon", "data": {{}}}}
+- "Salon sıcaklığı kaç derece?" → HA_COMMAND: {{"type": "get_state", "entity_id": "sensor.salon_sicaklik"}}
+- "Petekler açık mı?" → HA_COMMAND: {{"type": "get_state", "entity_id": "group.salon_ve_kucukoda_petekler"}}
+- "Petekleri aç" → HA_COMMAND: {{"type": "service", "domain": "group", "service": "turn_on", "entity_id": "group.salon_ve_kucukoda_petekler", "data": {{}}}}
+- "Odayı 22 dereceye ayarla" → HA_COMMAND: {{"type": "service", "domain": "climate", "service": "set_temperature", "entity_id": "climate.oda", "data": {{"temperature": 22}}}}
+
+**Not:** Eğer entity bulunamazsa veya işlem Home Assistant ile ilgili değilse, sadece cevap ver, HA_COMMAND ekleme.
+"""
+
+# Appended to the system prompt when the message is a question
+_QUESTION_HINT = (
+    "\n\n⚠️⚠️⚠️ BU MESAJ BİR SORU! ⚠️⚠️⚠️\n"
+    "MUTLAKA şu formatı kullan: HA_COMMAND: {\"type\": \"get_state\", \"entity_id\": \"sensor.xxx\"}\n"
+    "ASLA service çağrısı YAPMA! ASLA \"get_temperature\", \"update\", \"read\" gibi action kullanma!\n"
+    "SADECE: {\"type\": \"get_state\", \"entity_id\": \"...\"}"
+)
+
+# Bumped by invalidate_settings() so bots reload HA settings and LLM provider on their next message
+_settings_generation = 0
+
+
+def invalidate_settings():
+    """Make bots reload HA settings and LLM provider on their next message (call after config writes)"""
+    global _settings_generation
+    _settings_generation += 1
+    # Cached replies came from the old provider/config
+    get_response_cache().clear()
+
+
+# Shared HA clients keyed by (base_url, api_token) so connection pools survive across messages
+_ha_client_cache: Dict[Tuple[str, str], HomeAssistantClient] = {}
+
+
+def _get_ha_client(base_url: str, api_token: Optional[str]) -> HomeAssistantClient:
+    """Get cached HA client for given config (created on first use)"""
+    key = (base_url, api_token or "")
+    client = _ha_client_cache.get(key)
+    if client is None:
+        client = HomeAssistantClient(base_url, api_token)
+        _ha_client_cache[key] = client
+    return client
+
+
+async def evict_ha_client(base_url: str, api_token: Optional[str]):
+    """Close and evict the cached HA client for given config (no-op if none is cached)"""
+    client = _ha_client_cache.pop((base_url, api_token or ""), None)
+    if client is None:
+        return
+    try:
+        await client.close()
+    except Exception as e:
+        logger.error("Error closing HA client: %s", e)
+
+
+async def close_ha_clients():
+    """Close and evict all cached HA clients"""
+    clients = list(_ha_client_cache.values())
+    _ha_client_cache.clear()
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error("Error closing HA client: %s", e)
+
+
+class _ChatSerialUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different chats concurrently, but one at a time and in arrival order per chat"""
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # chat_id -> [lock, updates holding or waiting for it]; dropped when the count reaches 0
+        self._chat_locks: Dict[int, List[Any]] = {}
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Run update's handler coroutine after earlier updates of the same chat have finished"""
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            await coroutine
+            return
+        
+        entry = self._chat_locks.get(chat.id)
+        if entry is None:
+            entry = self._chat_locks[chat.id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+    
+    async def initialize(self) -> None:
+        """Nothing to set up"""
+    
+    async def shutdown(self) -> None:
+        """Nothing to release"""
+
 
 class TelegramBotService:
     """Telegram Bot Service"""
@@ -28,13 +397,13 @@ class TelegramBotService:
         # When config is a database model, access attributes directly
         try:
             self.bot_token = str(config.bot_token) if config.bot_token else ""
-            self.allowed_chat_ids = self._parse_chat_ids(str(config.allowed_chat_ids) if config.allowed_chat_ids else "[]")
+            self.allowed_chat_ids: FrozenSet[str] = self._parse_chat_ids(str(config.allowed_chat_ids) if config.allowed_chat_ids else "[]")
             self.enabled = bool(config.enabled) if hasattr(config, 'enabled') else False
             self.rate_limit = int(config.rate_limit) if hasattr(config, 'rate_limit') else 10
         except Exception as e:
-            logger.error(f"Error extracting config values: {e}")
+            logger.error("Error extracting config values: %s", e)
             self.bot_token = ""
-            self.allowed_chat_ids = []
+            self.allowed_chat_ids = frozenset()
             self.enabled = False
             self.rate_limit = 10
         
@@ -42,46 +411,126 @@ class TelegramBotService:
         self.ha_client: Optional[HomeAssistantClient] = None
         self.ha_dry_run: bool = False
         self.rate_limiter = RateLimiter(max_requests=self.rate_limit, time_window=60)
+        self.send_limiter = OutboundLimiter(global_rate=30.0, per_chat_interval=1.0)  # Telegram Bot API limits
         self.entity_cache = get_entity_cache()
+        self.log_writer = get_log_writer()
+        self.response_cache = get_response_cache()
+        self._mention: Optional[str] = None  # "@BotUsername", set once username is known
+        self._mention_token: Optional[str] = None  # lowercased _mention for stripping
+        self._mention_re: Optional[re.Pattern] = None  # compiled lazily for the non-ASCII fallback
+        self._entity_prompt_cache: Optional[Tuple[int, str]] = None  # (entity cache version, formatted list)
+        self._services_cache: Optional[Tuple[float, HomeAssistantClient, str]] = None  # (time, client, formatted)
+        self._settings_cache: Optional[Tuple[int, float, Any, Optional[BaseLLMProvider]]] = None  # (generation, time, HA settings, provider)
+        self._find_cache: OrderedDict[Tuple[int, str], Optional[str]] = OrderedDict()  # LRU for _find_entity
+        self._provider_breakers: Dict[str, CircuitBreaker] = {}  # provider class name -> breaker
+    
+    def reload_config(self, config: TelegramConfig) -> bool:
+        """
+        Apply config changes to the running bot without rebuilding the Application
+        
+        Args:
+            config: Fresh TelegramConfig from database
+        
+        Returns:
+            False if bot token changed (full restart required), True otherwise
+        """
+        new_token = str(config.bot_token) if config.bot_token else ""
+        if new_token != self.bot_token:
+            return False
+        
+        self.config = config
+        self.allowed_chat_ids = self._parse_chat_ids(str(config.allowed_chat_ids) if config.allowed_chat_ids else "[]")
+        self.enabled = bool(config.enabled)
         
-        # Action to service mapping for generic service calls
-        # Maps user-friendly actions to HA service names
-        self.action_to_service = {
-            "on": "turn_on",
-            "off": "turn_off",
-            "set_temperature": "set_temperature",
-            "set_brightness": "turn_on",  # brightness is a parameter
-            "set_color": "turn_on",  # color is a parameter
-            "toggle": "toggle",
-            "open": "open_cover",
-            "close": "close_cover",
-            "stop": "stop_cover",
-            "lock": "lock",
-            "unlock": "unlock",
-        }
-    
-    def _parse_chat_ids(self, chat_ids_str: str) -> list:
+        rate_limit = int(config.rate_limit) if config.rate_limit else 10
+        if rate_limit != self.rate_limit:
+            self.rate_limit = rate_limit
+            self.rate_limiter = RateLimiter(max_requests=self.rate_limit, time_window=60)
+        
+        logger.info("Bot config reloaded in place")
+        return True
+    
+    def _parse_chat_ids(self, chat_ids_str: str) -> FrozenSet[str]:
         """Parse JSON chat IDs (supports regular IDs and group IDs)"""
-        import json
         try:
-            ids = json.loads(chat_ids_str)
+            # Stored as a JSON array of ints/strings; pulling out the integers is enough.
             # Convert all IDs to strings for consistency (including negative group IDs)
-            return [str(i) for i in ids]
-        except:
-            return []
+            return frozenset(str(int(i)) for i in _CHAT_ID_RE.findall(chat_ids_str))
+        except Exception:
+            return frozenset()
+    
+    def _get_mention(self, bot_username: str) -> str:
+        """Get "@bot_username" (built once, the username doesn't change while running)"""
+        if self._mention is None:
+            self._mention = f"@{bot_username}"
+        return self._mention
+    
+    def _strip_mention(self, message: str, bot_username: str) -> str:
+        """Remove @bot_username mentions from message (case-insensitive)"""
+        if self._mention_token is None:
+            self._mention_token = self._get_mention(bot_username).lower()
+        token = self._mention_token
+        
+        message_lower = message.lower()
+        if len(message_lower) != len(message):
+            # Lowercasing changed string length, indexes would not line up
+            if self._mention_re is None:
+                self._mention_re = re.compile(rf'{re.escape(token)}\s*', re.IGNORECASE)
+            return self._mention_re.sub('', message).strip()
+        
+        idx = message_lower.find(token)
+        while idx >= 0:
+            message = message[:idx] + message[idx + len(token):].lstrip()
+            message_lower = message.lower()
+            idx = message_lower.find(token, idx)
+        return message.strip()
     
-    def _init_ha_client(self, db: Session):
-        """Initialize Home Assistant client"""
+    def _load_ha_settings(self, db: Session) -> Optional[Tuple[str, Optional[str], bool]]:
+        """Load Home Assistant settings as (base_url, api_token, dry_run)"""
         ha_config = db.query(HomeAssistantConfig).first()
         if ha_config and ha_config.base_url:
-            self.ha_client = HomeAssistantClient(ha_config.base_url, ha_config.api_token)
-            self.ha_dry_run = getattr(ha_config, 'dry_run_mode', False)
-            logger.info(f"HA client initialized: {ha_config.base_url}, dry_run: {self.ha_dry_run}")
+            return ha_config.base_url, ha_config.api_token, bool(getattr(ha_config, 'dry_run_mode', False))
+        return None
+    
+    def _load_ha_and_provider(self) -> Tuple[Optional[Tuple[str, Optional[str], bool]], Optional[BaseLLMProvider]]:
+        """Load HA settings and active LLM provider (blocking, run via asyncio.to_thread)"""
+        db = SessionLocal()
+        try:
+            return self._load_ha_settings(db), LLMProviderFactory.get_active_provider(db)
+        finally:
+            db.close()
+    
+    async def _get_ha_and_provider(self) -> Tuple[Optional[Tuple[str, Optional[str], bool]], Optional[BaseLLMProvider]]:
+        """Get HA settings and active LLM provider (reloaded after _SETTINGS_TTL or invalidate_settings())"""
+        now = time.monotonic()
+        cached = self._settings_cache
+        if cached and cached[0] == _settings_generation and now - cached[1] < _SETTINGS_TTL:
+            return cached[2], cached[3]
+        
+        # Generation read before loading, so an invalidation during the load is not lost
+        generation = _settings_generation
+        ha_settings, provider = await asyncio.to_thread(self._load_ha_and_provider)
+        self._settings_cache = (generation, now, ha_settings, provider)
+        return ha_settings, provider
+    
+    def _apply_ha_settings(self, ha_settings: Optional[Tuple[str, Optional[str], bool]]):
+        """Initialize Home Assistant client from loaded settings"""
+        if ha_settings:
+            base_url, api_token, dry_run = ha_settings
+            self.ha_client = _get_ha_client(base_url, api_token)
+            self.ha_dry_run = dry_run
+            logger.info("HA client initialized: %s, dry_run: %s", base_url, self.ha_dry_run)
         else:
             self.ha_client = None
             self.ha_dry_run = False
             logger.warning("HA client not initialized - no config or base_url")
     
+    def _needs_ha_context(self, message: str) -> bool:
+        """Check if message may need HA entities/services in the prompt (HA keyword or known entity name)"""
+        if not self.ha_client:
+            return False
+        return bool(_LOOKS_HA_RELATED_RE.search(message)) or self.entity_cache.mentions_entity(message)
+    
     async def _refresh_entity_cache(self):
         """Refresh entity cache from Home Assistant"""
         if not self.ha_client:
@@ -90,9 +539,9 @@ class TelegramBotService:
         try:
             entities = await self.ha_client.get_states()
             self.entity_cache.set(entities)
-            logger.info(f"Refreshed entity cache: {len(entities)} entities")
+            logger.info("Refreshed entity cache: %s entities", len(entities))
         except Exception as e:
-            logger.error(f"Failed to refresh entity cache: {e}")
+            logger.error("Failed to refresh entity cache: %s", e)
     
     def _get_entity_list_for_prompt(self) -> str:
         """Get formatted entity list for LLM prompt"""
@@ -106,8 +555,16 @@ class TelegramBotService:
         
         return entity_list
     
-    async def _get_enhanced_entity_list(self) -> str:
-        """Get entity list with state information for enhanced prompt"""
+    async def _get_enhanced_entity_list(self, message: str = "") -> str:
+        """
+        Get compact entity list with state information for enhanced prompt
+        
+        Args:
+            message: User message; when it names entities, only those are listed
+        
+        Returns:
+            Entity lines grouped under domain headers
+        """
         if not self.ha_client:
             return "Home Assistant not configured"
         
@@ -116,31 +573,75 @@ class TelegramBotService:
             if not cached:
                 return "Entity list is being loaded..."
             
-            # Limit to first 100 entities to avoid prompt size issues
-            entities = cached[:100]
-            formatted = []
+            # Entities named in the message are enough context for the LLM
+            matched = self.entity_cache.match_records(message, _NON_ENTITY_WORDS, _NON_ENTITY_STEMS) if message else []
+            if matched:
+                shown = matched[:_PROMPT_ENTITY_LIMIT]
+                entity_list = self._format_entity_block(shown)
+                if len(cached) > len(shown):
+                    entity_list += f"\n... ve {len(cached) - len(shown)} entity daha"
+                return entity_list
             
-            for entity in entities:
-                entity_id = entity.get("entity_id", "")
-                attributes = entity.get("attributes", {})
-                state = entity.get("state", "unknown")
-                friendly_name = attributes.get("friendly_name", entity_id)
-                domain = entity_id.split(".")[0] if "." in entity_id else "unknown"
-                
-                # Add unit if available
-                unit = attributes.get("unit_of_measurement", "")
-                state_display = f"{state} {unit}".strip() if unit else state
-                
-                formatted.append(f"- {entity_id} ({friendly_name}): {state_display} [{domain}]")
+            # Full list only changes when the entity cache is refreshed
+            version = self.entity_cache.version
+            if self._entity_prompt_cache and self._entity_prompt_cache[0] == version:
+                return self._entity_prompt_cache[1]
             
-            if len(cached) > 100:
-                formatted.append(f"\n... ve {len(cached) - 100} entity daha")
+            # Limit entities to avoid prompt size issues
+            entity_list = self._format_entity_block(self.entity_cache.records[:_PROMPT_ENTITY_LIMIT])
+            if len(cached) > _PROMPT_ENTITY_LIMIT:
+                entity_list += f"\n... ve {len(cached) - _PROMPT_ENTITY_LIMIT} entity daha"
             
-            return "\n".join(formatted) if formatted else "No entities found"
+            self._entity_prompt_cache = (version, entity_list)
+            return entity_list
         except Exception as e:
-            logger.error(f"Error formatting entity list: {e}")
+            logger.error("Error formatting entity list: %s", e)
             return "Error loading entity list"
     
+    @staticmethod
+    def _format_entity_block(records: List[EntityRecord]) -> str:
+        """Format records as entity_id|name|state lines grouped under [domain] headers"""
+        by_domain: Dict[str, List[str]] = {}
+        for record in records:
+            line = f"{record.entity_id}|{record.friendly_name}|{record.state}{record.unit}"
+            by_domain.setdefault(record.domain, []).append(line)
+        
+        if not by_domain:
+            return "No entities found"
+        return "\n".join(f"[{domain}]\n" + "\n".join(lines) for domain, lines in by_domain.items())
+    
+    async def _get_services_info(self) -> str:
+        """Get formatted service list for prompt (cached for _SERVICES_TTL seconds)"""
+        if not self.ha_client:
+            return ""
+        
+        now = time.monotonic()
+        if self._services_cache:
+            cached_at, client, services_info = self._services_cache
+            if client is self.ha_client and now - cached_at < _SERVICES_TTL:
+                return services_info
+        
+        services_info = ""
+        try:
+            services = await self.ha_client.get_services()
+            if services:
+                # Format services for prompt (limit to common domains)
+                services_list = []
+                for domain in _COMMON_DOMAINS:
+                    if domain in services:
+                        domain_services = [s.get("service", "") for s in services[domain] if isinstance(s, dict)]
+                        if domain_services:
+                            services_list.append(f"{domain}: {', '.join(domain_services[:10])}")  # Limit to 10 services per domain
+                if services_list:
+                    services_info = "\n".join(services_list)
+        except Exception as e:
+            logger.warning("Failed to get services: %s", e)
+        
+        # Don't cache failures, retry on next message
+        if services_info:
+            self._services_cache = (now, self.ha_client, services_info)
+        return services_info
+    
     async def _find_entity(self, query: str) -> Optional[str]:
         """Find entity ID by name/query (fuzzy matching)"""
         if not self.ha_client:
@@ -154,56 +655,83 @@ class TelegramBotService:
             
             query_lower = query.lower().strip()
             
-            # Exact match first
-            for entity in cached:
-                entity_id = entity.get("entity_id", "")
-                if entity_id.lower() == query_lower:
-                    return entity_id
-            
-            # Fuzzy match
-            best_match = None
-            best_score = 0
-            
-            for entity in cached:
-                entity_id = entity.get("entity_id", "")
-                attributes = entity.get("attributes", {})
-                friendly_name = attributes.get("friendly_name", "").lower()
-                
-                # Check if query matches entity_id or friendly_name
-                if query_lower in entity_id.lower() or query_lower in friendly_name:
-                    # Score based on match quality
-                    score = 0
-                    if query_lower in entity_id.lower():
-                        score += 2
-                    if query_lower in friendly_name:
-                        score += 3
-                    if entity_id.lower().startswith(query_lower):
-                        score += 1
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_match = entity_id
+            # Repeat lookups within the same cache version hit the LRU
+            key = (self.entity_cache.version, query_lower)
+            if key in self._find_cache:
+                self._find_cache.move_to_end(key)
+                return self._find_cache[key]
             
-            return best_match if best_match else None
+            result = self._find_entity_uncached(query_lower)
+            self._find_cache[key] = result
+            if len(self._find_cache) > _FIND_CACHE_SIZE:
+                self._find_cache.popitem(last=False)
+            return result
             
         except Exception as e:
-            logger.error(f"Error finding entity: {e}")
+            logger.error("Error finding entity: %s", e)
+            return None
+    
+    def _find_entity_uncached(self, query_lower: str) -> Optional[str]:
+        """Find best match for a normalized query (exact entity_id/name, partial ID/name, then RapidFuzz within the query's domain)"""
+        # Exact matches are O(1) index probes
+        entity = self.entity_cache.by_id.get(query_lower)
+        if entity is not None:
+            return entity.get("entity_id")
+        entity_id = self.entity_cache.by_name.get(query_lower)
+        if entity_id is not None:
+            return entity_id
+        
+        # Partial IDs/names ("light.salon", "salon"): query contained in entity_id or friendly name,
+        # scored name > ID > ID prefix; ties keep the first entity in cache order
+        best_match = None
+        best_score = 0
+        for record in self.entity_cache.records:
+            in_id = query_lower in record.entity_id_lower
+            in_name = query_lower in record.friendly_name_lower
+            if not (in_id or in_name):
+                continue
+            score = 2 * in_id + 3 * in_name + record.entity_id_lower.startswith(query_lower)
+            if score > best_score:
+                best_score = score
+                best_match = record.entity_id
+        if best_match is not None:
+            return best_match
+        
+        # Fuzzy match only against object IDs of the same domain (typo tolerant, never cross-domain)
+        domain, sep, object_id = query_lower.partition(".")
+        choices = self.entity_cache.fuzzy_choices.get(domain) if sep and object_id else None
+        if not choices:
+            return None
+        
+        object_ids, entity_ids = choices
+        result = process.extractOne(
+            object_id,
+            object_ids,
+            scorer=fuzz.ratio,
+            processor=fuzz_utils.default_process,
+            score_cutoff=_FUZZY_SCORE_CUTOFF
+        )
+        if result is None:
             return None
+        return entity_ids[result[2]]
     
     async def _execute_ha_command_generic(self, ha_command: Dict[str, Any], bot_response: str, dry_run: bool = False) -> Tuple[str, int, list]:
         """
         Generic HA command executor - LLM decides the service, we just call it.
+        Expects a command checked by _validate_ha_command.
         Returns: (updated_bot_response, success_count, error_messages)
         """
-        command_type = ha_command.get("type", "service")  # "service" or "get_state"
-        entity_id = ha_command.get("entity_id")
+        command_type = ha_command["type"]  # "service" or "get_state"
+        entity_id = ha_command["entity_id"]
         success_count = 0
         error_messages = []
+        extra_parts: List[str] = []  # appended to bot_response once at the end
         
         # Backward compatibility: support old format
         if "entities" in ha_command and not entity_id:
-            entities = ha_command.get("entities", [])
-            action = ha_command.get("action", "").lower() if ha_command.get("action") else ""
+            # LLM sometimes lists the same entity twice; dedupe keeping order
+            entities = list(dict.fromkeys(ha_command["entities"] or []))
+            action = (ha_command.get("action") or "").lower()
             
             # Actions that should be converted to get_state (read operations)
             read_actions = ["get_state", "get_temperature", "read", "update", "check", "status", "state", "get"]
@@ -213,7 +741,7 @@ class TelegramBotService:
                 
                 # Check if action is a read operation
                 if action in read_actions or not action or action == "":
-                    logger.info(f"Converting read action '{action}' to get_state for {entity_id}")
+                    logger.info("Converting read action '%s' to get_state for %s", action, entity_id)
                     command_type = "get_state"
                     ha_command = {
                         "type": "get_state",
@@ -222,13 +750,13 @@ class TelegramBotService:
                 else:
                     # Try to infer domain and service from action
                     domain = entity_id.split(".")[0] if "." in entity_id else "light"
-                    service = self.action_to_service.get(action, action)
+                    service = _ACTION_TO_SERVICE.get(action, action)
                     ha_command = {
                         "type": "service",
                         "domain": domain,
                         "service": service,
                         "entity_id": entity_id,
-                        "data": ha_command.get("data", {})
+                        "data": ha_command["data"]
                     }
                     if "temperature" in ha_command:
                         ha_command["data"]["temperature"] = ha_command["temperature"]
@@ -236,9 +764,9 @@ class TelegramBotService:
         
         # Support multiple entities (for backward compatibility with old format)
         entities_to_process = []
-        if "entities" in ha_command and isinstance(ha_command["entities"], list):
+        if isinstance(ha_command.get("entities"), list):
             # Multiple entities in old format
-            entities_to_process = ha_command["entities"]
+            entities_to_process = list(dict.fromkeys(ha_command["entities"]))
         elif entity_id:
             # Single entity
             entities_to_process = [entity_id]
@@ -252,7 +780,9 @@ class TelegramBotService:
                 # Read entity state(s)
                 for entity_id in entities_to_process:
                     try:
-                        states = await self.ha_client.get_states(entity_id)
+                        # Freshly refreshed cache already has the state, skip the HTTP round-trip
+                        cached_state = self.entity_cache.get_entity(entity_id, max_age=_STATE_MAX_AGE)
+                        states = [cached_state] if cached_state else await self.ha_client.get_states(entity_id)
                         if states and len(states) > 0:
                             state = states[0]
                             state_value = state.get("state", "N/A")
@@ -268,20 +798,20 @@ class TelegramBotService:
                             # Update bot response with actual value
                             if "**" in bot_response or "derece" in bot_response.lower() or "°" in bot_response or "%" in bot_response:
                                 # Replace placeholder
-                                bot_response = re.sub(r'\*\*[\d.]+\*\*', f"**{state_value}**", bot_response)
-                                bot_response = re.sub(r'[\d.]+(?=\s*(derece|°|%))', state_value, bot_response)
+                                bot_response = _STATE_BOLD_RE.sub(f"**{state_value}**", bot_response)
+                                bot_response = _STATE_UNIT_RE.sub(state_value, bot_response)
                                 if unit and unit not in bot_response:
                                     bot_response = bot_response.replace(state_value, f"{state_value} {unit}")
                             else:
                                 # Add value if not present
-                                bot_response += f"\n\n📊 {friendly_name}: **{value_str}**"
+                                extra_parts.append(f"\n\n📊 {friendly_name}: **{value_str}**")
                             
-                            logger.info(f"{'[DRY RUN] ' if dry_run else ''}Read state for {entity_id}: {value_str}")
+                            logger.info("%sRead state for %s: %s", '[DRY RUN] ' if dry_run else '', entity_id, value_str)
                             success_count += 1
                         else:
                             error_messages.append(f"{entity_id}: Değer okunamadı")
                     except Exception as e:
-                        logger.error(f"Error reading state for {entity_id}: {e}")
+                        logger.error("Error reading state for %s: %s", entity_id, e)
                         error_messages.append(f"{entity_id}: {str(e)}")
                     
             elif command_type == "service":
@@ -294,16 +824,16 @@ class TelegramBotService:
                     error_messages.append(f"Domain veya service belirtilmemiş: domain={domain}, service={service}")
                 else:
                     if dry_run:
-                        logger.info(f"[DRY RUN] Would call service: {domain}.{service} on {entity_id} with data: {data}")
-                        bot_response += f"\n\n🔍 [DRY RUN] Komut çalıştırılacaktı: {domain}.{service} → {entity_id}"
+                        logger.info("[DRY RUN] Would call service: %s.%s on %s with data: %s", domain, service, entity_id, data)
+                        extra_parts.append(f"\n\n🔍 [DRY RUN] Komut çalıştırılacaktı: {domain}.{service} → {entity_id}")
                     else:
                         try:
                             result = await self.ha_client.call_service(domain, service, entity_id, data)
-                            logger.info(f"Successfully called {domain}.{service} on {entity_id}: {result}")
+                            logger.info("Successfully called %s.%s on %s: %s", domain, service, entity_id, result)
                             success_count += 1
                         except Exception as e:
                             error_str = str(e)
-                            logger.error(f"Service call failed: {error_str}")
+                            logger.error("Service call failed: %s", error_str)
                             
                             # Try to fix common errors
                             if "400" in error_str:
@@ -314,10 +844,10 @@ class TelegramBotService:
                                         actual_domain = entity_info.get("domain")
                                         if actual_domain and actual_domain != domain:
                                             # Domain mismatch - try with correct domain
-                                            logger.info(f"Domain mismatch detected: {domain} → {actual_domain}, retrying...")
+                                            logger.info("Domain mismatch detected: %s → %s, retrying...", domain, actual_domain)
                                             try:
                                                 result = await self.ha_client.call_service(actual_domain, service, entity_id, data)
-                                                logger.info(f"Successfully called {actual_domain}.{service} on {entity_id} after domain correction: {result}")
+                                                logger.info("Successfully called %s.%s on %s after domain correction: %s", actual_domain, service, entity_id, result)
                                                 success_count += 1
                                             except Exception as retry_e:
                                                 error_messages.append(f"Domain düzeltmesi sonrası hata: {str(retry_e)}")
@@ -326,10 +856,10 @@ class TelegramBotService:
                                             if actual_domain == "group":
                                                 # Group entities might need group.turn_on instead of light.turn_on
                                                 if service in ["turn_on", "turn_off"]:
-                                                    logger.info(f"Group entity detected, using group.{service}")
+                                                    logger.info("Group entity detected, using group.%s", service)
                                                     try:
                                                         result = await self.ha_client.call_service("group", service, entity_id, data)
-                                                        logger.info(f"Successfully called group.{service} on {entity_id}: {result}")
+                                                        logger.info("Successfully called group.%s on %s: %s", service, entity_id, result)
                                                         success_count += 1
                                                     except Exception as group_e:
                                                         error_messages.append(f"Group service hatası: {str(group_e)}")
@@ -340,36 +870,42 @@ class TelegramBotService:
                                     else:
                                         error_messages.append(f"Service hatası: {error_str}")
                                 except Exception as info_e:
-                                    logger.error(f"Error getting entity info for error correction: {info_e}")
+                                    logger.error("Error getting entity info for error correction: %s", info_e)
                                     error_messages.append(f"Service hatası: {error_str}")
                             else:
                                 error_messages.append(f"Service hatası: {error_str}")
+                        
+                        if success_count:
+                            # Device state changed (possibly others too, e.g. groups); get_state must ask HA
+                            self.entity_cache.invalidate_states()
             else:
                 error_messages.append(f"Bilinmeyen komut tipi: {command_type}")
                 
         except Exception as e:
-            logger.error(f"Error executing HA command: {e}", exc_info=True)
+            logger.error("Error executing HA command: %s", e, exc_info=True)
             error_messages.append(f"{entity_id}: {str(e)}")
         
         # Add result message
         if not dry_run:
             if success_count > 0 and not error_messages:
-                bot_response += f"\n\n✅ {success_count} komut başarıyla çalıştırıldı."
+                extra_parts.append(f"\n\n✅ {success_count} komut başarıyla çalıştırıldı.")
             elif success_count > 0:
-                bot_response += f"\n\n⚠️ {success_count} komut çalıştırıldı, bazı hatalar: {', '.join(error_messages)}"
+                extra_parts.append(f"\n\n⚠️ {success_count} komut çalıştırıldı, bazı hatalar: {', '.join(error_messages)}")
             elif error_messages:
-                bot_response += f"\n\n❌ Komut çalıştırılamadı: {', '.join(error_messages)}"
+                extra_parts.append(f"\n\n❌ Komut çalıştırılamadı: {', '.join(error_messages)}")
+        
+        if extra_parts:
+            bot_response = "".join([bot_response, *extra_parts])
         
         return bot_response, success_count, error_messages
     
     def _is_ha_command(self, message: str) -> bool:
         """Check if message is a Home Assistant command"""
-        ha_commands = [
-            r'/(\w+)\s+(on|off)',
-            r'/(\w+)\s+set\s+(\d+\.?\d*)',
-            r'(\w+)\s+(\w+)',
-        ]
-        return any(re.match(pattern, message, re.IGNORECASE) for pattern in ha_commands)
+        stripped = message.lstrip()
+        if stripped.startswith("/"):
+            return True
+        first_word = stripped.split(" ", 1)[0].lower()
+        return first_word in _HA_VERB_SET
     
     async def _execute_ha_command(self, message: str) -> Dict[str, Any]:
         """Execute Home Assistant command"""
@@ -382,35 +918,65 @@ class TelegramBotService:
             
             if "on" in message:
                 # Extract entity ID: /light.turn_on on -> light
-                parts = message.split()
-                entity_id = parts[0].replace("/", "")
+                entity_id = message.partition(" ")[0].replace("/", "")
                 return await self.ha_client.turn_on(entity_id)
             
             elif "off" in message:
-                parts = message.split()
-                entity_id = parts[0].replace("/", "")
+                entity_id = message.partition(" ")[0].replace("/", "")
                 return await self.ha_client.turn_off(entity_id)
             
             elif "set" in message and "temperature" in message:
                 # Extract entity and temperature: /thermostat set 22
-                parts = message.split()
-                entity_id = parts[0].replace("/", "")
-                temp = float(parts[-1])
+                entity_id = message.partition(" ")[0].replace("/", "")
+                temp = float(message.rpartition(" ")[2])
                 return await self.ha_client.set_temperature(entity_id, temp)
             
             elif message.startswith("/"):
                 # Direct service call: /entity_name.service
-                entity_id = message[1:].split(".")[0]
-                service = message[1:].split(".")[1] if "." in message[1:] else "turn_on"
-                return await self.ha_client.call_service(entity_id.split(".")[0], service)
+                entity_id, sep, service = message[1:].partition(".")
+                if not sep:
+                    service = "turn_on"
+                return await self.ha_client.call_service(entity_id, service)
             
             else:
                 return {"success": False, "message": "Unknown HA command format"}
                 
         except Exception as e:
-            logger.error(f"HA command error: {e}")
+            logger.error("HA command error: %s", e)
             return {"success": False, "message": str(e)}
     
+    def _get_provider_breaker(self, provider: BaseLLMProvider) -> CircuitBreaker:
+        """Get circuit breaker for LLM provider type (created on first use)"""
+        name = type(provider).__name__
+        breaker = self._provider_breakers.get(name)
+        if breaker is None:
+            # Permanent errors (e.g. a safety-blocked response) are about one message, not the provider
+            breaker = CircuitBreaker(fail_threshold=5, reset_timeout=30, name=name, is_failure=_is_transient_error)
+            self._provider_breakers[name] = breaker
+        return breaker
+    
+    async def _send(self, chat, text: str):
+        """
+        Send text to chat within the outbound rate limits (with retry)
+        
+        Args:
+            chat: Telegram chat
+            text: Message text (one handler's whole reply, parts are joined before sending)
+        """
+        chat_id = str(chat.id)
+        
+        async def send_with_retry():
+            await self.send_limiter.acquire(chat_id)
+            await chat.send_message(text)
+        
+        await retry_async(
+            send_with_retry,
+            max_retries=2,
+            delay=0.5,
+            exceptions=(NetworkError, RetryAfter),
+            retry_on=_is_transient_send_error
+        )
+    
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages with rate limiting and error handling"""
         
@@ -422,19 +988,19 @@ class TelegramBotService:
         chat = update.effective_chat
         chat_id = str(chat.id)
         
-        logger.info(f"Received message from chat_id: {chat_id}, type: {chat.type}")
+        logger.info("Received message from chat_id: %s, type: %s", chat_id, chat.type)
         
         # Check if chat_id is allowed
         if chat_id not in self.allowed_chat_ids:
-            logger.warning(f"Unauthorized chat ID: {chat_id}")
+            logger.warning("Unauthorized chat ID: %s", chat_id)
             
             # In group chats, only respond if bot is mentioned
             if chat.type in ['group', 'supergroup']:
                 if update.message and update.message.text:
                     bot_username = context.bot.username if context.bot else None
-                    if bot_username and f"@{bot_username}" in update.message.text:
+                    if bot_username and self._get_mention(bot_username) in update.message.text:
                         # Bot is mentioned, allow response
-                        logger.info(f"Bot mentioned in group chat {chat_id}")
+                        logger.info("Bot mentioned in group chat %s", chat_id)
                     else:
                         # Not mentioned, ignore
                         return
@@ -443,21 +1009,21 @@ class TelegramBotService:
             else:
                 # Private chat - send unauthorized message
                 try:
-                    await chat.send_message("❌ Bu bot sizin için yetkilendirilmemiş.")
+                    await chat.send_message(_UNAUTHORIZED_MESSAGE)
                 except Exception as e:
-                    logger.error(f"Failed to send unauthorized message: {e}")
+                    logger.error("Failed to send unauthorized message: %s", e)
                 return
         
         # Rate limiting check
-        if not self.rate_limiter.is_allowed(chat_id):
-            remaining = self.rate_limiter.get_remaining(chat_id)
-            logger.warning(f"Rate limit exceeded for chat {chat_id}")
+        allowed, retry_after = self.rate_limiter.check(chat_id)
+        if not allowed:
+            logger.warning("Rate limit exceeded for chat %s", chat_id)
             try:
                 await chat.send_message(
-                    f"⏳ Çok fazla mesaj gönderdiniz. Lütfen {remaining} saniye bekleyin."
+                    f"⏳ Çok fazla mesaj gönderdiniz. Lütfen {math.ceil(retry_after)} saniye bekleyin."
                 )
             except Exception as e:
-                logger.error(f"Failed to send rate limit message: {e}")
+                logger.error("Failed to send rate limit message: %s", e)
             return
         
         # Get user message
@@ -471,204 +1037,150 @@ class TelegramBotService:
             bot_username = context.bot.username if context.bot else None
             if bot_username:
                 # Remove @bot_username mentions
-                user_message = re.sub(rf'@{bot_username}\s*', '', user_message, flags=re.IGNORECASE)
-                user_message = user_message.strip()
+                user_message = self._strip_mention(user_message, bot_username)
         
-        logger.info(f"User message: {user_message}")
+        logger.info("User message: %s", user_message)
         
-        # Get LLM provider
-        db = SessionLocal()
-        try:
-            # Initialize HA client (always refresh to get latest config)
-            self._init_ha_client(db)
-            
-            # Refresh entity cache if needed
-            if self.ha_client and not self.entity_cache.is_valid():
-                await self._refresh_entity_cache()
-            
-            provider = LLMProviderFactory.get_active_provider(db)
-            
-            if not provider:
-                await chat.send_message("❌ No LLM provider configured")
+        # HA config and LLM provider (reloaded in a worker thread when stale or after a config write)
+        ha_settings, provider = await self._get_ha_and_provider()
+        self._apply_ha_settings(ha_settings)
+        
+        # Skip HA context (entity list, services, /api/states round-trip) for plain chat
+        needs_ha_context = self._needs_ha_context(user_message)
+        
+        if not provider:
+            await self._send(chat, "❌ No LLM provider configured")
+            return
+        
+        # Services fetch and entity cache refresh (if needed) are independent HA calls, overlap them
+        services_info = "Service list not needed for this message"
+        if needs_ha_context:
+            ha_tasks = [self._get_services_info()]
+            if not self.entity_cache.is_valid():
+                ha_tasks.append(self._refresh_entity_cache())
+            ha_results = await asyncio.gather(*ha_tasks, return_exceptions=True)
+            services_info = ha_results[0] if isinstance(ha_results[0], str) else ""
+        
+        # Check if message is a question requiring state read
+        is_state_query, is_question = _classify_message(user_message)
+        
+        # Plain chat replies can be reused; HA-related ones depend on live state
+        cacheable = not needs_ha_context and not is_state_query
+        cached = self.response_cache.get(chat_id, user_message) if cacheable else None
+        if cached is not None:
+            cached_response, cached_provider = cached
+            logger.info("Response cache hit for chat %s", chat_id)
+            try:
+                await self._send(chat, cached_response)
+            except Exception as e:
+                logger.error("Failed to send cached response: %s", e)
                 return
+            self.log_writer.enqueue(chat_id, user_message, cached_response, cached_provider)
+            return
+        
+        # Get entity list with state information
+        if not self.ha_client:
+            entity_list = "Home Assistant not configured"
+        elif not needs_ha_context:
+            entity_list = "Entity list not needed for this message"
+        else:
+            entity_list = await self._get_enhanced_entity_list(user_message)
+        
+        # Enhanced system prompt with HA integration
+        system_prompt = _SYSTEM_PROMPT_TEMPLATE.format_map({
+            "entity_list": entity_list,
+            "services_info": services_info or "Service listesi yükleniyor...",
+        })
+        
+        # If it's a question, strongly hint LLM to use get_state
+        if is_question or is_state_query:
+            system_prompt += _QUESTION_HINT
+        
+        # Generate response with HA integration (with retry)
+        try:
+            async def generate_with_retry():
+                return await provider.generate(user_message, system_prompt)
             
-            # Check if message is a question requiring state read
-            is_state_query = QuestionDetector.requires_state_read(user_message)
-            is_question = QuestionDetector.is_question(user_message)
+            # Breaker fails fast while the provider is down instead of every chat paying the retries
+            bot_response = await self._get_provider_breaker(provider).call(lambda: retry_async(
+                generate_with_retry,
+                max_retries=3,
+                delay=1.0,
+                backoff=2.0,
+                exceptions=(Exception,),
+                retry_on=_is_transient_error,
+                on_retry=lambda attempt, exc: logger.warning(
+                    "LLM generation retry %s: %s", attempt, exc
+                ),
+                max_elapsed=_LLM_RETRY_BUDGET
+            ))
+            logger.info("LLM response: %s", bot_response)
             
-            # Get entity list with state information
-            entity_list = await self._get_enhanced_entity_list() if self.ha_client else "Home Assistant not configured"
+            # Check if HA command is in response
+            ha_command = None
+            response_text, command_json = _extract_ha_command(bot_response)
+            if command_json:
+                try:
+                    # orjson.JSONDecodeError is a ValueError too
+                    ha_command = _validate_ha_command(orjson.loads(command_json))
+                    # Remove HA_COMMAND from response
+                    bot_response = response_text.strip()
+                except ValueError as e:
+                    logger.warning("Failed to parse HA command: %s", e)
+            elif cacheable and _HA_COMMAND_MARKER not in bot_response:
+                # A marker without a parsable object is a failed command, not a reusable chat reply
+                self.response_cache.put(chat_id, user_message, bot_response, provider.name)
             
-            # Get available services
-            services_info = ""
-            if self.ha_client:
+            # Validate and fix entity ID if present
+            if ha_command and ha_command["entity_id"] and self.ha_client:
+                entity_id = ha_command["entity_id"]
                 try:
-                    services = await self.ha_client.get_services()
-                    if services:
-                        # Format services for prompt (limit to common domains)
-                        common_domains = ["light", "switch", "climate", "cover", "lock", "group", "fan", "media_player"]
-                        services_list = []
-                        for domain in common_domains:
-                            if domain in services:
-                                domain_services = [s.get("service", "") for s in services[domain] if isinstance(s, dict)]
-                                if domain_services:
-                                    services_list.append(f"{domain}: {', '.join(domain_services[:10])}")  # Limit to 10 services per domain
-                        if services_list:
-                            services_info = "\n".join(services_list)
+                    matched = await self._find_entity(entity_id)
+                    if matched:
+                        ha_command["entity_id"] = matched
+                        logger.info("Validated entity: %s → %s", entity_id, matched)
+                    else:
+                        logger.warning("Entity not found: %s, using as-is", entity_id)
                 except Exception as e:
-                    logger.warning(f"Failed to get services: {e}")
+                    logger.error("Error validating entity: %s", e)
             
-            # Enhanced system prompt with HA integration
-            system_prompt = f"""
-Sen bir akıllı ev asistanısın. Kullanıcının mesajını anla ve Home Assistant komutlarını doğru formatta üret.
-
-**Mevcut Home Assistant Entity'leri ve Durumları:**
-{entity_list}
-
-**Mevcut Service'ler:**
-{services_info if services_info else "Service listesi yükleniyor..."}
-
-**ÖNEMLİ KURALLAR:**
-
-1. **Soru Tespiti (ÇOK ÖNEMLİ!):**
-   - Kullanıcı soru soruyorsa (?, kaç, nedir, açık mı, kapalı mı, merak ediyorum) → MUTLAKA type: "get_state" kullan
-   - "Açık mı?", "Kaç derece?", "Nedir?", "Merak ediyorum" gibi sorular için service çağrısı YAPMA, sadece state oku
-   - SORU SORULUYORSA: {"type": "get_state", "entity_id": "..."} formatını kullan
-   - ASLA "get_temperature", "update", "read" gibi action'lar kullanma - sadece "get_state"!
-
-2. **Entity Seçimi:**
-   - Entity ID'leri yukarıdaki listeden tam olarak kullan
-   - Entity'nin mevcut state'ini kontrol et (yukarıdaki listede var)
-   - Group entity'ler için group domain service'lerini kullan (örn: group.turn_on, group.turn_off)
-
-3. **Service Seçimi:**
-   - Her entity'nin domain'ini belirle (light, switch, climate, sensor, cover, lock, group, vb.)
-   - Yukarıdaki service listesinden doğru service'i seç
-   - Group entity'ler için group domain service'lerini kullan
-
-4. **Format:**
-   - İşlem yapılacaksa: {{"type": "service", "domain": "light", "service": "turn_on", "entity_id": "light.salon", "data": {{}}}}
-   - State okunacaksa: {{"type": "get_state", "entity_id": "sensor.salon_sicaklik"}}
-
-**Örnekler:**
-- "Salon ışıklarını aç" → HA_COMMAND: {{"type": "service", "domain": "light", "service": "turn_on", "entity_id": "light.salon", "data": {{}}}}
-- "Salon sıcaklığı kaç derece?" → HA_COMMAND: {{"type": "get_state", "entity_id": "sensor.salon_sicaklik"}}
-- "Petekler açık mı?" → HA_COMMAND: {{"type": "get_state", "entity_id": "group.salon_ve_kucukoda_petekler"}}
-- "Petekleri aç" → HA_COMMAND: {{"type": "service", "domain": "group", "service": "turn_on", "entity_id": "group.salon_ve_kucukoda_petekler", "data": {{}}}}
-- "Odayı 22 dereceye ayarla" → HA_COMMAND: {{"type": "service", "domain": "climate", "service": "set_temperature", "entity_id": "climate.oda", "data": {{"temperature": 22}}}}
-
-**Not:** Eğer entity bulunamazsa veya işlem Home Assistant ile ilgili değilse, sadece cevap ver, HA_COMMAND ekleme.
-            """
+            # Execute HA command if present
+            if ha_command:
+                if not self.ha_client:
+                    logger.warning("HA command found but HA client not initialized")
+                    bot_response += "\n\n⚠️ Home Assistant yapılandırılmamış. Lütfen admin panel'den yapılandırın."
+                elif self.ha_dry_run:
+                    # Dry run mode
+                    bot_response, success_count, error_messages = await self._execute_ha_command_generic(ha_command, bot_response, dry_run=True)
+                else:
+                    # Execute command (executor appends the result summary to the response)
+                    bot_response, success_count, error_messages = await self._execute_ha_command_generic(ha_command, bot_response, dry_run=False)
+                    
+                    if error_messages and success_count == 0:
+                        logger.error("HA command execution failed: %s", ', '.join(error_messages))
             
-            # If it's a question, strongly hint LLM to use get_state
-            if is_question or is_state_query:
-                system_prompt += "\n\n⚠️⚠️⚠️ BU MESAJ BİR SORU! ⚠️⚠️⚠️\n"
-                system_prompt += "MUTLAKA şu formatı kullan: HA_COMMAND: {\"type\": \"get_state\", \"entity_id\": \"sensor.xxx\"}\n"
-                system_prompt += "ASLA service çağrısı YAPMA! ASLA \"get_temperature\", \"update\", \"read\" gibi action kullanma!\n"
-                system_prompt += "SADECE: {\"type\": \"get_state\", \"entity_id\": \"...\"}"
+            # Send response (with retry)
+            await self._send(chat, bot_response)
+            logger.info("Sent response to chat %s", chat_id)
             
-            # Generate response with HA integration (with retry)
+            # Log conversation (batched insert in the background)
+            self.log_writer.enqueue(chat_id, user_message, bot_response, provider.name)
+            
+        except CircuitOpenError as e:
+            logger.warning("Skipping LLM call: %s", e)
             try:
-                async def generate_with_retry():
-                    return await provider.generate(user_message, system_prompt)
-                
-                bot_response = await retry_async(
-                    generate_with_retry,
-                    max_retries=3,
-                    delay=1.0,
-                    backoff=2.0,
-                    exceptions=(Exception,),
-                    on_retry=lambda attempt, exc: logger.warning(
-                        f"LLM generation retry {attempt}: {str(exc)}"
-                    )
-                )
-                logger.info(f"LLM response: {bot_response}")
-                
-                # Check if HA command is in response
-                ha_command = None
-                if "HA_COMMAND:" in bot_response:
-                    # Extract HA command
-                    match = re.search(r'HA_COMMAND:\s*(\{.*?\})', bot_response, re.DOTALL)
-                    if match:
-                        try:
-                            import json
-                            ha_command = json.loads(match.group(1))
-                            # Remove HA_COMMAND from response
-                            bot_response = bot_response.split("HA_COMMAND:")[0].strip()
-                            
-                            # Validate and fix entity ID if present
-                            if ha_command and "entity_id" in ha_command:
-                                entity_id = ha_command["entity_id"]
-                                if self.ha_client:
-                                    matched = await self._find_entity(entity_id)
-                                    if matched:
-                                        ha_command["entity_id"] = matched
-                                        logger.info(f"Validated entity: {entity_id} → {matched}")
-                                    else:
-                                        logger.warning(f"Entity not found: {entity_id}, using as-is")
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"Failed to parse HA command: {e}")
-                        except Exception as e:
-                            logger.error(f"Error validating entity: {e}")
-                
-                # Execute HA command if present
-                if ha_command:
-                    if not self.ha_client:
-                        logger.warning("HA command found but HA client not initialized")
-                        bot_response += "\n\n⚠️ Home Assistant yapılandırılmamış. Lütfen admin panel'den yapılandırın."
-                    elif self.ha_dry_run:
-                        # Dry run mode
-                        bot_response, success_count, error_messages = await self._execute_ha_command_generic(ha_command, bot_response, dry_run=True)
-                    else:
-                        # Execute command
-                        bot_response, success_count, error_messages = await self._execute_ha_command_generic(ha_command, bot_response, dry_run=False)
-                        
-                        # Add result message
-                        if success_count > 0 and not error_messages:
-                            bot_response += f"\n\n✅ {success_count} komut başarıyla çalıştırıldı."
-                        elif success_count > 0:
-                            bot_response += f"\n\n⚠️ {success_count} komut çalıştırıldı, bazı hatalar: {', '.join(error_messages)}"
-                        elif error_messages:
-                            bot_response += f"\n\n❌ Komut çalıştırılamadı: {', '.join(error_messages)}"
-                        
-                        if error_messages and success_count == 0:
-                            logger.error(f"HA command execution failed: {', '.join(error_messages)}")
-                            bot_response += f"\n\n⚠️ Akıllı ev komutu başarısız: {', '.join(error_messages)}"
-                
-                # Send response (with retry)
-                async def send_with_retry():
-                    await chat.send_message(bot_response)
-                
-                await retry_async(
-                    send_with_retry,
-                    max_retries=2,
-                    delay=0.5,
-                    exceptions=(Exception,)
-                )
-                logger.info(f"Sent response to chat {chat_id}")
-                
-                # Log conversation
-                log = ConversationLog(
-                    chat_id=chat_id,
-                    user_message=user_message,
-                    bot_response=bot_response,
-                    llm_provider=db.query(LLMProvider).filter(LLMProvider.active == True).first().name
-                )
-                db.add(log)
-                db.commit()
-                
-            except Exception as e:
-                logger.error(f"LLM generation error: {e}", exc_info=True)
-                try:
-                    error_msg = "❌ Üzgünüm, bir hata oluştu. Lütfen daha sonra tekrar deneyin."
-                    if logger.isEnabledFor(logging.DEBUG):
-                        error_msg += f"\n\nHata: {str(e)}"
-                    await chat.send_message(error_msg)
-                except Exception as send_error:
-                    logger.error(f"Failed to send error message: {send_error}")
-        
-        finally:
-            db.close()
+                await self._send(chat, _LLM_DEGRADED_MESSAGE)
+            except Exception as send_error:
+                logger.error("Failed to send degraded service message: %s", send_error)
+        except Exception as e:
+            logger.error("LLM generation error: %s", e, exc_info=True)
+            try:
+                error_msg = "❌ Üzgünüm, bir hata oluştu. Lütfen daha sonra tekrar deneyin."
+                if logger.isEnabledFor(logging.DEBUG):
+                    error_msg += f"\n\nHata: {str(e)}"
+                await self._send(chat, error_msg)
+            except Exception as send_error:
+                logger.error("Failed to send error message: %s", send_error)
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command (works in both private and group chats)"""
@@ -680,57 +1192,38 @@ Sen bir akıllı ev asistanısın. Kullanıcının mesajını anla ve Home Assis
         
         # Check if chat is allowed (for group chats)
         if chat_id not in self.allowed_chat_ids:
-            logger.warning(f"Unauthorized chat ID for /start: {chat_id}")
+            logger.warning("Unauthorized chat ID for /start: %s", chat_id)
             if chat.type in ['group', 'supergroup']:
                 # In groups, only respond if bot is mentioned
                 if update.message and update.message.text:
                     bot_username = context.bot.username if context.bot else None
-                    if bot_username and f"@{bot_username}" not in update.message.text:
+                    if bot_username and self._get_mention(bot_username) not in update.message.text:
                         return  # Don't respond if not mentioned
             else:
                 # Private chat - send unauthorized message
                 try:
-                    await chat.send_message("❌ Bu bot sizin için yetkilendirilmemiş.")
+                    await chat.send_message(_UNAUTHORIZED_MESSAGE)
                 except Exception as e:
-                    logger.error(f"Failed to send unauthorized message: {e}")
+                    logger.error("Failed to send unauthorized message: %s", e)
                 return
         
-        help_text = """
-👋 Merhaba! Ben akıllı ev asistanınızım.
-
-📝 Kullanabileceğiniz komutlar:
-
-**LLM Chat:**
-• Herhangi bir soru sorun, cevap vereceğim
-• Doğal dil komutlarınızı anlayabilirim
-
-**Home Assistant Komutları:**
-• "Salon ışıklarını aç" - LLM entity'leri bulur ve açar
-• "Yatak odasını kapat" - LLM entity'leri bulur ve kapatır
-• "Odayı 22 dereceye ayarla" - LLM termostat'ı ayarlar
-
-💡 Örnekler:
-• "Bugün hava nasıl?" - LLM cevap verir
-• "Salon ışıklarını aç" - HA komutu gönderir
-• "Odayı 22 dereceye ayarla" - HA komutu gönderir
-
-🔧 Ayarlar:
-• Bot Admin Panel: http://192.168.7.62:8000
-• LLM Provider: Ollama/OpenAI/Gemini seçebilirsiniz
-• Chat ID'leri: Admin panel'den yönetebilirsiniz
-        """
-        
         try:
-            await update.message.reply_text(help_text)
+            await update.message.reply_text(_HELP_TEXT)
         except Exception as e:
-            logger.error(f"Failed to send /start response: {e}")
+            logger.error("Failed to send /start response: %s", e)
     
     def setup(self):
         """Setup bot application"""
-        self.application = Application.builder().token(self.bot_token).build()
+        # Chats are handled concurrently so a slow LLM call does not stall other chats,
+        # while each chat's messages are still answered one at a time, in order
+        self.application = (
+            Application.builder()
+            .token(self.bot_token)
+            .concurrent_updates(_ChatSerialUpdateProcessor(_MAX_CONCURRENT_UPDATES))
+            .build()
+        )
         
         # Add handlers
-        from telegram.ext import CommandHandler
         self.application.add_handler(CommandHandler("start", self.start_command))
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_message))
         
@@ -746,10 +1239,11 @@ Sen bir akıllı ev asistanısın. Kullanıcının mesajını anla ve Home Assis
             await self.application.updater.initialize()
             await self.application.start()
             await self.application.updater.start_polling()
+            self.log_writer.start()
             logger.info("Telegram bot started and polling")
             return True
         except Exception as e:
-            logger.error(f"Failed to start Telegram bot: {e}")
+            logger.error("Failed to start Telegram bot: %s", e)
             import traceback
             traceback.print_exc()
             return False
@@ -763,63 +1257,97 @@ Sen bir akıllı ev asistanısın. Kullanıcının mesajını anla ve Home Assis
                 await self.application.shutdown()
                 logger.info("Telegram bot stopped")
             except Exception as e:
-                logger.error(f"Error stopping bot: {e}")
+                logger.error("Error stopping bot: %s", e)
+        
+        try:
+            await self.log_writer.stop()
+        except Exception as e:
+            logger.error("Error stopping conversation log writer: %s", e)
 
 
 # Global bot instance
 _bot_instance: Optional[TelegramBotService] = None
 
+# Serializes creation/restart of _bot_instance so concurrent callers never start two bots
+_bot_lock = asyncio.Lock()
+
+
+def load_telegram_config() -> Optional[TelegramConfig]:
+    """Load Telegram config row (blocking, run via asyncio.to_thread)"""
+    db = SessionLocal()
+    try:
+        return db.query(TelegramConfig).first()
+    finally:
+        db.close()
+
 
 async def get_bot_instance() -> Optional[TelegramBotService]:
     """Get or create bot instance"""
     global _bot_instance
     
-    if _bot_instance is None:
-        db = SessionLocal()
-        try:
-            config = db.query(TelegramConfig).first()
+    # Fast path without the lock once the bot exists
+    if _bot_instance is not None:
+        return _bot_instance
+    
+    async with _bot_lock:
+        # Re-check: another caller may have created it while we waited
+        if _bot_instance is None:
+            config = await asyncio.to_thread(load_telegram_config)
             if config and config.enabled:
-                _bot_instance = TelegramBotService(config)
-                await _bot_instance.start()
-        finally:
-            db.close()
+                bot = TelegramBotService(config)
+                await bot.start()
+                _bot_instance = bot
     
     return _bot_instance
 
 
 async def start_bot(token: str) -> bool:
-    """Start Telegram bot with given token"""
-    db = SessionLocal()
+    """Start Telegram bot with given token (no-op if a bot is already running; use restart_bot to replace it)"""
+    global _bot_instance
     try:
-        config = db.query(TelegramConfig).first()
-        if config and config.enabled and config.bot_token:
-            global _bot_instance
-            _bot_instance = TelegramBotService(config)
-            success = await _bot_instance.start()
-            logger.info("Telegram bot started via start_bot function")
-            return success
+        async with _bot_lock:
+            # A second Application would poll with the same token alongside the first
+            if _bot_instance is not None:
+                logger.info("Telegram bot already running, not starting another")
+                return True
+            
+            config = await asyncio.to_thread(load_telegram_config)
+            if config and config.enabled and config.bot_token:
+                bot = TelegramBotService(config)
+                success = await bot.start()
+                if success:
+                    _bot_instance = bot
+                    logger.info("Telegram bot started via start_bot function")
+                return success
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
+        logger.error("Failed to start bot: %s", e)
         return False
-    finally:
-        db.close()
+    
+    logger.info("Telegram bot not configured or disabled")
+    return False
 
 
-async def restart_bot():
-    """Restart bot with new config"""
+async def restart_bot(force: bool = False):
+    """Restart bot with new config (force rebuilds it even if the config could be reloaded in place)"""
     global _bot_instance
     
-    if _bot_instance:
-        try:
-            await _bot_instance.stop()
-        except Exception as e:
-            logger.error(f"Error stopping bot during restart: {e}")
-        _bot_instance = None
-    
-    # Get fresh config and start new instance
-    db = SessionLocal()
-    try:
-        config = db.query(TelegramConfig).first()
+    async with _bot_lock:
+        config = await asyncio.to_thread(load_telegram_config)
+        
+        # Same token: apply config in place instead of tearing the bot down
+        if not force and _bot_instance and config and config.enabled and config.bot_token and _bot_instance.reload_config(config):
+            return _bot_instance
+        
+        if _bot_instance:
+            try:
+                await _bot_instance.stop()
+            except Exception as e:
+                logger.error("Error stopping bot during restart: %s", e)
+            _bot_instance = None
+        
+        await close_ha_clients()
+        
+        # Start new instance with the fresh config
         if config and config.enabled and config.bot_token:
             _bot_instance = TelegramBotService(config)
             success = await _bot_instance.start()
@@ -829,5 +1357,3 @@ async def restart_bot():
         else:
             logger.info("Bot not enabled or no token, skipping restart")
             return None
-    finally:
-        db.close()
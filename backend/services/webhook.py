@@ -2,6 +2,7 @@
 Webhook support for Telegram bot (production mode)
 """
 import logging
+from collections import OrderedDict
 from typing import Optional
 from fastapi import Request
 from telegram import Update
@@ -11,6 +12,9 @@ from .telegram_bot import TelegramBotService
 
 logger = logging.getLogger(__name__)
 
+# Recent update_ids remembered to drop Telegram's redelivered webhook updates
+_SEEN_UPDATES_SIZE = 4096
+
 
 class WebhookManager:
     """Manages Telegram webhook for production deployment"""
@@ -18,6 +22,7 @@ class WebhookManager:
     def __init__(self, bot_service: TelegramBotService):
         self.bot_service = bot_service
         self.webhook_url: Optional[str] = None
+        self._seen_updates: OrderedDict[int, None] = OrderedDict()  # LRU of processed update_ids
     
     async def set_webhook(self, webhook_url: str, secret_token: Optional[str] = None) -> bool:
         """
@@ -40,11 +45,11 @@ class WebhookManager:
                 secret_token=secret_token
             )
             self.webhook_url = webhook_url
-            logger.info(f"Webhook set to: {webhook_url}")
+            logger.info("Webhook set to: %s", webhook_url)
             return True
         
         except Exception as e:
-            logger.error(f"Failed to set webhook: {e}")
+            logger.error("Failed to set webhook: %s", e)
             return False
     
     async def delete_webhook(self) -> bool:
@@ -59,7 +64,7 @@ class WebhookManager:
             return True
         
         except Exception as e:
-            logger.error(f"Failed to delete webhook: {e}")
+            logger.error("Failed to delete webhook: %s", e)
             return False
     
     async def get_webhook_info(self) -> dict:
@@ -80,7 +85,7 @@ class WebhookManager:
             }
         
         except Exception as e:
-            logger.error(f"Failed to get webhook info: {e}")
+            logger.error("Failed to get webhook info: %s", e)
             return {"error": str(e)}
     
     async def process_webhook_update(self, request: Request, secret_token: Optional[str] = None) -> dict:
@@ -109,11 +114,20 @@ class WebhookManager:
             if not update:
                 return {"error": "Invalid update"}
             
-            # Process update
-            await self.bot_service.application.process_update(update)
+            # Telegram redelivers updates after timeouts/5xx; handle each update_id once
+            if update.update_id in self._seen_updates:
+                logger.info("Skipping duplicate webhook update %s", update.update_id)
+                return {"success": True, "dedup": True}
+            self._seen_updates[update.update_id] = None
+            if len(self._seen_updates) > _SEEN_UPDATES_SIZE:
+                self._seen_updates.popitem(last=False)
+            
+            # Process update through the update processor so per-chat ordering also holds for webhooks
+            application = self.bot_service.application
+            await application.update_processor.process_update(update, application.process_update(update))
             
             return {"success": True}
         
         except Exception as e:
-            logger.error(f"Error processing webhook update: {e}", exc_info=True)
+            logger.error("Error processing webhook update: %s", e, exc_info=True)
             return {"error": str(e)}
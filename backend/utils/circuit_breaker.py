@@ -0,0 +1,101 @@
+"""
+Circuit breaker utilities for failing external services
+"""
+import time
+import logging
+from typing import Callable, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, let one trial call through after reset_timeout"""
+    
+    def __init__(
+        self,
+        fail_threshold: int = 5,
+        reset_timeout: float = 30,
+        name: str = "circuit",
+        is_failure: Optional[Callable[[Exception], bool]] = None
+    ):
+        """
+        Initialize circuit breaker
+        
+        Args:
+            fail_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before allowing a trial call
+            name: Name used in log messages
+            is_failure: Optional predicate; exceptions for which it returns False (e.g. a rejected
+                request) mean the service answered, and are not counted as failures
+        """
+        self.fail_threshold = fail_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.is_failure = is_failure
+        self.failures = 0
+        self.opened_at: Optional[float] = None  # monotonic time the circuit opened, None if closed
+    
+    def allow(self) -> bool:
+        """
+        Check if a call may proceed
+        
+        Returns:
+            True if closed, or if open long enough that a trial call is due
+        """
+        if self.opened_at is None:
+            return True
+        
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        
+        # Half-open: re-arm the timer so only this call probes the service
+        self.opened_at = now
+        return True
+    
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        if self.opened_at is not None:
+            logger.info("Circuit %s closed", self.name)
+        self.failures = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        """Count a failed call, opening the circuit at fail_threshold"""
+        self.failures += 1
+        if self.failures >= self.fail_threshold:
+            if self.opened_at is None:
+                logger.warning("Circuit %s opened after %s failures", self.name, self.failures)
+            self.opened_at = time.monotonic()
+    
+    async def call(self, func: Callable) -> Any:
+        """
+        Run async function through the breaker
+        
+        Args:
+            func: Async function to call
+        
+        Returns:
+            Function result
+        
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+        
+        try:
+            result = await func()
+        except Exception as e:
+            if self.is_failure is None or self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        
+        self.record_success()
+        return result
@@ -3,17 +3,29 @@ Structured logging configuration
 """
 import logging
 import sys
-from typing import Any, Dict
-import json
-from datetime import datetime
+import time
+from typing import Any, Dict, Tuple
+import orjson
 
 
 class StructuredFormatter(logging.Formatter):
     """JSON structured formatter for logs"""
     
+    # (epoch second, "YYYY-MM-DDTHH:MM:SS") of the last formatted record, replaced as one tuple
+    _second_cache: Tuple[int, str] = (-1, "")
+    
+    def _timestamp(self, created: float) -> str:
+        """Format record time as UTC ISO 8601 with microseconds, reusing the per-second prefix"""
+        second = int(created)
+        cached_second, prefix = self._second_cache
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(second))
+            self._second_cache = (second, prefix)
+        return f"{prefix}.{int((created - second) * 1_000_000):06d}"
+    
     def format(self, record: logging.LogRecord) -> str:
         log_data: Dict[str, Any] = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
             "message": record.getMessage(),
@@ -27,7 +39,7 @@ class StructuredFormatter(logging.Formatter):
         if hasattr(record, "extra_fields"):
             log_data.update(record.extra_fields)
         
-        return json.dumps(log_data, ensure_ascii=False)
+        return orjson.dumps(log_data, default=str).decode()
 
 
 def setup_logging(level: str = "INFO", use_json: bool = False):
@@ -2,6 +2,31 @@
 Question detection utility for determining if a message is asking for information
 """
 import re
+from typing import List, Tuple
+
+# Turkish dotted/dotless capitals; str.lower() maps "I" to "i" and "İ" to "i" plus a combining dot
+_TR_CAPITALS = str.maketrans({"İ": "i", "I": "ı"})
+
+
+def _normalize(text: str) -> str:
+    """Lowercase text with Turkish casing rules, so "AÇIK MI" becomes "açık mı" """
+    return text.translate(_TR_CAPITALS).lower()
+
+
+def _fuse(patterns: List[str]) -> "re.Pattern[str]":
+    """Compile regex patterns into one alternation (matched against normalized text)"""
+    return re.compile("|".join(patterns))
+
+
+def _minimal_words(words: List[str]) -> Tuple[str, ...]:
+    """Drop words that contain another word of the list (matching the shorter one implies them)"""
+    lowered = [_normalize(w) for w in words]
+    return tuple(w for w in lowered if not any(o != w and o in w for o in lowered))
+
+
+def _contains_any(text: str, words: Tuple[str, ...]) -> bool:
+    """Check if text contains any of words (each test is a C-level substring search)"""
+    return any(map(text.__contains__, words))
 
 
 class QuestionDetector:
@@ -27,49 +52,49 @@ class QuestionDetector:
         r'\w+\s+(nedir|ne)',
     ]
 
+    # Common state questions (plain substrings)
+    STATE_INDICATORS = [
+        "açık mı", "kapalı mı", "çalışıyor mu", "çalışmıyor mu",
+        "kaç derece", "kaç %", "ne kadar", "durumu nedir",
+        "durum", "state", "değeri", "değer"
+    ]
+
+    # Plain words are checked as substrings of the normalized message; only real patterns go through regex
+    _QUESTION_WORDS = _minimal_words(QUESTION_WORDS)
+    _STATE_WORDS = _minimal_words(STATE_INDICATORS)
+    _QUESTION_RE = _fuse(QUESTION_PATTERNS)
+    _STATE_RE = _fuse(STATE_QUERY_PATTERNS)
+
+    @classmethod
+    def classify(cls, message: str) -> Tuple[bool, bool]:
+        """
+        Classify message, normalizing it once for both checks
+
+        Returns:
+            (is_question, is_state_query)
+        """
+        lowered = _normalize(message)
+        is_question = (
+            "?" in lowered
+            or _contains_any(lowered, cls._QUESTION_WORDS)
+            or cls._QUESTION_RE.search(lowered) is not None
+        )
+        is_state_query = _contains_any(lowered, cls._STATE_WORDS) or cls._STATE_RE.search(lowered) is not None
+        return is_question, is_state_query
+
     @classmethod
     def is_question(cls, message: str) -> bool:
         """Check if message is a question"""
-        message_lower = message.lower().strip()
-
-        # Check for question mark
-        if '?' in message:
+        if "?" in message:
             return True
-
-        # Check for question words
-        for word in cls.QUESTION_WORDS:
-            if word in message_lower:
-                return True
-
-        # Check for question patterns
-        for pattern in cls.QUESTION_PATTERNS:
-            if re.search(pattern, message_lower):
-                return True
-
-        return False
+        lowered = _normalize(message)
+        return _contains_any(lowered, cls._QUESTION_WORDS) or cls._QUESTION_RE.search(lowered) is not None
 
     @classmethod
     def is_state_query(cls, message: str) -> bool:
         """Check if message is asking about entity state"""
-        message_lower = message.lower().strip()
-
-        # Check for state query patterns
-        for pattern in cls.STATE_QUERY_PATTERNS:
-            if re.search(pattern, message_lower):
-                return True
-
-        # Check for common state questions
-        state_indicators = [
-            "açık mı", "kapalı mı", "çalışıyor mu", "çalışmıyor mu",
-            "kaç derece", "kaç %", "ne kadar", "durumu nedir",
-            "durum", "state", "değeri", "değer"
-        ]
-
-        for indicator in state_indicators:
-            if indicator in message_lower:
-                return True
-
-        return False
+        lowered = _normalize(message)
+        return _contains_any(lowered, cls._STATE_WORDS) or cls._STATE_RE.search(lowered) is not None
 
     @classmethod
     def requires_state_read(cls, message: str) -> bool:
@@ -1,16 +1,25 @@
 """
 Rate limiting utilities for Telegram bot
 """
+import asyncio
+import math
 import time
-from typing import Dict
-from collections import defaultdict
+from typing import Dict, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Added to suggested waits: at the exact computed time the estimate is still at the limit
+_WAIT_EPSILON = 0.001
+
 
 class RateLimiter:
-    """Simple rate limiter using token bucket algorithm"""
+    """
+    Simple rate limiter using sliding window counter algorithm
+    
+    check() never awaits, so under asyncio each check-and-count runs atomically
+    on the event loop and concurrent handlers cannot double-admit. Not thread-safe.
+    """
     
     def __init__(self, max_requests: int = 10, time_window: int = 60):
         """
@@ -22,50 +31,120 @@ class RateLimiter:
         """
         self.max_requests = max_requests
         self.time_window = time_window
-        self.requests: Dict[str, list] = defaultdict(list)
+        # identifier -> [window index, count in current window, count in previous window]
+        self.buckets: Dict[str, List[int]] = {}
     
-    def is_allowed(self, identifier: str) -> bool:
+    def _load(self, identifier: str, now: float) -> Tuple[List[int], float]:
+        """Get identifier's counters rolled to the current window, and the estimated request count"""
+        window = int(now // self.time_window)
+        bucket = self.buckets.get(identifier)
+        if bucket is None:
+            bucket = [window, 0, 0]
+        elif bucket[0] != window:
+            # Current window becomes previous only if adjacent, otherwise both are stale
+            bucket[2] = bucket[1] if window - bucket[0] == 1 else 0
+            bucket[1] = 0
+            bucket[0] = window
+        
+        # Previous window's count weighted by how much of it still overlaps the sliding window
+        overlap = 1 - (now % self.time_window) / self.time_window
+        return bucket, bucket[2] * overlap + bucket[1]
+    
+    def check(self, identifier: str) -> Tuple[bool, float]:
         """
-        Check if request is allowed
+        Check if request is allowed and how long to wait otherwise
         
         Args:
             identifier: Unique identifier (e.g., chat_id)
         
         Returns:
-            True if allowed, False if rate limited
+            (allowed, seconds until next request is allowed; 0.0 if allowed)
         """
-        now = time.time()
+        now = time.monotonic()
+        bucket, estimate = self._load(identifier, now)
+        self.buckets[identifier] = bucket
         
-        # Clean old requests outside time window
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if now - req_time < self.time_window
-        ]
+        if estimate < self.max_requests:
+            bucket[1] += 1
+            return True, 0.0
+        
+        logger.warning("Rate limit exceeded for %s", identifier)
+        elapsed = now % self.time_window
+        _, current, previous = bucket
+        if current < self.max_requests:
+            # Wait until the previous window's share decays enough
+            wait = max(0.0, (1 - (self.max_requests - current) / previous) * self.time_window - elapsed)
+        else:
+            # Wait into the next window, where the current count decays instead
+            wait = (self.time_window - elapsed) + (1 - self.max_requests / current) * self.time_window
+        return False, wait + _WAIT_EPSILON
+    
+    def is_allowed(self, identifier: str) -> bool:
+        """
+        Check if request is allowed
         
-        # Check if limit exceeded
-        if len(self.requests[identifier]) >= self.max_requests:
-            logger.warning(f"Rate limit exceeded for {identifier}")
-            return False
+        Args:
+            identifier: Unique identifier (e.g., chat_id)
         
-        # Add current request
-        self.requests[identifier].append(now)
-        return True
+        Returns:
+            True if allowed, False if rate limited
+        """
+        return self.check(identifier)[0]
     
     def get_remaining(self, identifier: str) -> int:
         """Get remaining requests in current time window"""
-        now = time.time()
-        
-        # Clean old requests
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier]
-            if now - req_time < self.time_window
-        ]
-        
-        return max(0, self.max_requests - len(self.requests[identifier]))
+        _, estimate = self._load(identifier, time.monotonic())
+        return max(0, math.ceil(self.max_requests - estimate))
     
     def reset(self, identifier: str = None):
         """Reset rate limiter for identifier or all"""
         if identifier:
-            self.requests.pop(identifier, None)
+            self.buckets.pop(identifier, None)
         else:
-            self.requests.clear()
+            self.buckets.clear()
+
+
+class OutboundLimiter:
+    """
+    Spaces outgoing sends to stay under global and per-chat rate limits
+    
+    Each acquire() reserves the next free slot synchronously and sleeps until it,
+    so concurrent senders are served in call order without polling or a queue.
+    """
+    
+    def __init__(self, global_rate: float = 30.0, per_chat_interval: float = 1.0):
+        """
+        Initialize outbound limiter
+        
+        Args:
+            global_rate: Maximum sends per second across all chats
+            per_chat_interval: Minimum seconds between sends to one chat
+        """
+        self.global_interval = 1 / global_rate
+        self.per_chat_interval = per_chat_interval
+        self._next_global = 0.0
+        # chat_id -> earliest monotonic time of the next send to that chat
+        self._next_chat: Dict[str, float] = {}
+    
+    async def acquire(self, chat_id: str):
+        """
+        Wait until a send to chat_id is allowed
+        
+        Args:
+            chat_id: Target chat ID
+        """
+        now = time.monotonic()
+        if len(self._next_chat) > 1024:
+            self._next_chat = {k: t for k, t in self._next_chat.items() if t > now}
+        
+        # Per-chat slot first, so a chat waiting its turn does not hold a global slot
+        chat_slot = max(now, self._next_chat.get(chat_id, 0.0))
+        self._next_chat[chat_id] = chat_slot + self.per_chat_interval
+        if chat_slot > now:
+            await asyncio.sleep(chat_slot - now)
+            now = time.monotonic()
+        
+        global_slot = max(now, self._next_global)
+        self._next_global = global_slot + self.global_interval
+        if global_slot > now:
+            await asyncio.sleep(global_slot - now)
@@ -3,22 +3,40 @@ Retry utilities for error handling
 """
 import asyncio
 import logging
+import random
 from typing import Callable, Any, Optional, Type
 from functools import wraps
 
 logger = logging.getLogger(__name__)
 
 
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Get server-instructed wait in seconds from exception, if it carries one"""
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is None:
+        return None
+    if hasattr(retry_after, "total_seconds"):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
 async def retry_async(
     func: Callable,
     max_retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
     exceptions: tuple = (Exception,),
-    on_retry: Optional[Callable] = None
+    on_retry: Optional[Callable] = None,
+    retry_on: Optional[Callable[[Exception], bool]] = None,
+    max_elapsed: Optional[float] = None,
+    max_delay: float = 15.0
 ) -> Any:
     """
-    Retry async function with exponential backoff
+    Retry async function with full-jitter exponential backoff
+    
+    Exceptions carrying a retry_after hint (e.g. telegram.error.RetryAfter on
+    HTTP 429) wait the server-instructed time plus up to 1s of jitter instead,
+    or are raised immediately when the hint exceeds max_delay.
     
     Args:
         func: Async function to retry
@@ -27,6 +45,9 @@ async def retry_async(
         backoff: Backoff multiplier
         exceptions: Tuple of exceptions to catch
         on_retry: Optional callback on retry (receives attempt number and exception)
+        retry_on: Optional predicate; exceptions for which it returns False are raised immediately
+        max_elapsed: Optional wall-clock budget in seconds; no retry is scheduled past it
+        max_delay: Cap in seconds on the backoff delay; longer retry_after hints fail fast
     
     Returns:
         Function result
@@ -35,6 +56,8 @@ async def retry_async(
         Last exception if all retries fail
     """
     last_exception = None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_elapsed if max_elapsed is not None else None
     
     for attempt in range(max_retries + 1):
         try:
@@ -42,10 +65,25 @@ async def retry_async(
         except exceptions as e:
             last_exception = e
             
+            if retry_on is not None and not retry_on(e):
+                raise
+            
             if attempt < max_retries:
-                wait_time = delay * (backoff ** attempt)
+                wait_time = _retry_after(e)
+                if wait_time is None:
+                    wait_time = random.uniform(0, min(max_delay, delay * (backoff ** attempt)))
+                elif wait_time > max_delay:
+                    # Retrying sooner would only earn another 429, and waiting blocks the caller too long
+                    logger.error("Server asked to retry after %.0fs (max %ss), giving up", wait_time, max_delay)
+                    raise
+                else:
+                    wait_time += random.uniform(0, 1)
+                if deadline is not None and loop.time() + wait_time > deadline:
+                    logger.error("Retry budget of %ss exhausted after %s attempts", max_elapsed, attempt + 1)
+                    raise
+                
                 logger.warning(
-                    f"Retry attempt {attempt + 1}/{max_retries} after {wait_time:.2f}s: {str(e)}"
+                    "Retry attempt %s/%s after %.2fs: %s", attempt + 1, max_retries, wait_time, e
                 )
                 
                 if on_retry:
@@ -56,7 +94,7 @@ async def retry_async(
                 
                 await asyncio.sleep(wait_time)
             else:
-                logger.error(f"All {max_retries + 1} retry attempts failed")
+                logger.error("All %s retry attempts failed", max_retries + 1)
     
     raise last_exception
 
@@ -65,7 +103,8 @@ def retry_decorator(
     max_retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    max_delay: float = 15.0
 ):
     """
     Decorator for retrying async functions
@@ -86,7 +125,8 @@ def retry_decorator(
                 max_retries=max_retries,
                 delay=delay,
                 backoff=backoff,
-                exceptions=exceptions
+                exceptions=exceptions,
+                max_delay=max_delay
             )
         
         return wrapper
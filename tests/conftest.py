@@ -0,0 +1,50 @@
+"""
+Shared fixtures for backend unit tests
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import response_cache, telegram_bot
+from backend.services.entity_cache import EntityCache
+from backend.services.telegram_bot import TelegramBotService
+from backend.utils import circuit_breaker, rate_limiter
+
+
+def _make_entity(entity_id: str, friendly_name: str = "", state: str = "off", unit: str = ""):
+    """Build a Home Assistant state dict as returned by /api/states"""
+    attributes = {"friendly_name": friendly_name}
+    if unit:
+        attributes["unit_of_measurement"] = unit
+    return {"entity_id": entity_id, "state": state, "attributes": attributes}
+
+
+@pytest.fixture
+def make_entity():
+    """Builder for Home Assistant state dicts: make_entity(entity_id, friendly_name="", state="off", unit="")"""
+    return _make_entity
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for every module that reads time.monotonic, starting at a minute boundary"""
+    fake = SimpleNamespace(now=600.0)
+    fake_time = SimpleNamespace(monotonic=lambda: fake.now)
+    for module in (circuit_breaker, rate_limiter, response_cache, telegram_bot):
+        monkeypatch.setattr(module, "time", fake_time)
+    return fake
+
+
+@pytest.fixture
+def entity_cache():
+    """Empty entity cache (not the global instance)"""
+    return EntityCache()
+
+
+@pytest.fixture
+def bot_service(entity_cache):
+    """Bot service built from a plain config object, using its own entity cache"""
+    config = SimpleNamespace(bot_token="123:test", allowed_chat_ids="[1]", enabled=True, rate_limit=10)
+    service = TelegramBotService(config)
+    service.entity_cache = entity_cache
+    return service
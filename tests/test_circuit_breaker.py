@@ -0,0 +1,71 @@
+"""
+Tests for CircuitBreaker
+"""
+import asyncio
+
+import pytest
+
+from backend.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _call(breaker, exc=None):
+    async def func():
+        if exc is not None:
+            raise exc
+        return "ok"
+    return asyncio.run(breaker.call(func))
+
+
+def _fail(breaker, exc):
+    with pytest.raises(type(exc)):
+        _call(breaker, exc)
+
+
+def test_opens_after_threshold_and_fails_fast(clock):
+    breaker = CircuitBreaker(fail_threshold=3, reset_timeout=30)
+    for _ in range(3):
+        _fail(breaker, ConnectionError("down"))
+    
+    with pytest.raises(CircuitOpenError):
+        _call(breaker)
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(fail_threshold=2, reset_timeout=30)
+    _fail(breaker, ConnectionError("down"))
+    assert _call(breaker) == "ok"
+    _fail(breaker, ConnectionError("down"))
+    
+    assert _call(breaker) == "ok"
+
+
+def test_trial_call_after_reset_timeout(clock):
+    breaker = CircuitBreaker(fail_threshold=1, reset_timeout=30)
+    _fail(breaker, ConnectionError("down"))
+    
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        _call(breaker)
+    
+    clock.now += 1
+    assert _call(breaker) == "ok"
+    assert breaker.opened_at is None
+
+
+def test_failed_trial_call_reopens(clock):
+    breaker = CircuitBreaker(fail_threshold=1, reset_timeout=30)
+    _fail(breaker, ConnectionError("down"))
+    clock.now += 30
+    _fail(breaker, ConnectionError("still down"))
+    
+    with pytest.raises(CircuitOpenError):
+        _call(breaker)
+
+
+def test_errors_rejected_by_is_failure_do_not_open(clock):
+    breaker = CircuitBreaker(fail_threshold=2, reset_timeout=30, is_failure=lambda e: not isinstance(e, ValueError))
+    for _ in range(5):
+        _fail(breaker, ValueError("blocked by safety filter"))
+    
+    assert _call(breaker) == "ok"
+    assert breaker.failures == 0
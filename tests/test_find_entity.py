@@ -0,0 +1,59 @@
+"""
+Tests for entity ID validation (_find_entity_uncached)
+"""
+import pytest
+
+
+@pytest.fixture
+def home(entity_cache, make_entity):
+    entity_cache.set([
+        make_entity("lock.kapi", "Kapı"),
+        make_entity("light.salon", "Salon Işığı"),
+        make_entity("light.yatak_odasi", "Yatak Odası Lambası"),
+        make_entity("light.salon_lamba", "Salon Lambası"),
+        make_entity("sensor.salon_sicaklik", "Salon Sıcaklık", "21.5", "°C"),
+        make_entity("switch.kombi", "Kombi"),
+    ])
+    return entity_cache
+
+
+@pytest.mark.parametrize("query", [
+    "lock.garaj",
+    "light.mutfak",
+    "climate.salon",
+    "fan.salon",
+    "cover.yatak_odasi",
+    "sensor.mutfak_sicaklik",
+])
+def test_unknown_entity_is_not_swapped_for_another_device(bot_service, home, query):
+    assert bot_service._find_entity_uncached(query) is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("light.salon", "light.salon"),
+    ("salon lambası", "light.salon_lamba"),
+    ("light.salon_lamb", "light.salon_lamba"),
+    ("light.yatak_odas", "light.yatak_odasi"),
+    ("sensor.salon_sicaklk", "sensor.salon_sicaklik"),
+])
+def test_exact_and_near_identical_matches(bot_service, home, query, expected):
+    assert bot_service._find_entity_uncached(query) == expected
+
+
+def test_query_without_domain_is_not_fuzzy_matched(bot_service, home):
+    assert bot_service._find_entity_uncached("kombii") is None
+
+
+@pytest.mark.parametrize("query", ["light.salon", "salon"])
+def test_partial_id_resolves_like_baseline(bot_service, entity_cache, make_entity, query):
+    entity_cache.set([
+        make_entity("light.salon_lamba", "Salon Lamba"),
+        make_entity("group.salon_ve_kucukoda_petekler", "Salon ve Küçükoda Petekler"),
+        make_entity("sensor.salon_sicaklik", "Salon Sıcaklık", "21.5", "°C"),
+    ])
+    
+    assert bot_service._find_entity_uncached(query) == "light.salon_lamba"
+
+
+def test_partial_name_prefers_friendly_name_match(bot_service, home):
+    assert bot_service._find_entity_uncached("yatak odası") == "light.yatak_odasi"
@@ -0,0 +1,47 @@
+"""
+Tests for HA_COMMAND extraction from LLM responses
+"""
+import orjson
+import pytest
+
+from backend.services.telegram_bot import _extract_ha_command
+
+
+def test_no_marker_returns_text_unchanged():
+    assert _extract_ha_command("Merhaba!") == ("Merhaba!", None)
+
+
+def test_command_is_split_from_text():
+    text = 'Işığı açıyorum. HA_COMMAND: {"type": "service", "entity_id": "light.salon"}'
+    
+    response, command = _extract_ha_command(text)
+    
+    assert response == "Işığı açıyorum."
+    assert orjson.loads(command) == {"type": "service", "entity_id": "light.salon"}
+
+
+def test_nested_object_and_trailing_text():
+    text = 'Tamam HA_COMMAND: {"type": "service", "data": {"temperature": 22}} ayarlandı'
+    
+    response, command = _extract_ha_command(text)
+    
+    assert response == "Tamam"
+    assert orjson.loads(command)["data"] == {"temperature": 22}
+
+
+@pytest.mark.parametrize("value", ['a}b', 'a{b', 'a\\"}b', 'a\\\\'])
+def test_braces_and_escapes_inside_strings_are_ignored(value):
+    text = 'HA_COMMAND: {"entity_id": "' + value + '", "type": "get_state"}'
+    
+    _, command = _extract_ha_command(text)
+    
+    assert orjson.loads(command)["type"] == "get_state"
+
+
+@pytest.mark.parametrize("text", [
+    'HA_COMMAND: yok',
+    'HA_COMMAND: {"type": "service", "data": {"x": 1}',
+    'HA_COMMAND: {"entity_id": "light.salon}',
+])
+def test_missing_or_unterminated_object_returns_no_command(text):
+    assert _extract_ha_command(text) == (text, None)
@@ -0,0 +1,34 @@
+"""
+Tests for skipping HA context (entity list, services) on plain chat messages
+"""
+import pytest
+
+
+@pytest.fixture
+def with_ha(bot_service, entity_cache, make_entity):
+    bot_service.ha_client = object()
+    entity_cache.set([make_entity("switch.akvaryum_pompa", "Akvaryum Pompası", "on")])
+    return bot_service
+
+
+def test_no_ha_client_never_needs_context(bot_service):
+    assert not bot_service._needs_ha_context("salon ışığını aç")
+
+
+@pytest.mark.parametrize("message", [
+    "salon ışığını aç",
+    "Klima kaç derece?",
+    "kombi durumu nedir",
+    "akvaryum pompa çalışıyor mu",
+])
+def test_ha_keyword_or_entity_name_needs_context(with_ha, message):
+    assert with_ha._needs_ha_context(message)
+
+
+@pytest.mark.parametrize("message", [
+    "merhaba",
+    "bana bir fıkra anlat",
+    "what is the capital of France?",
+])
+def test_plain_chat_skips_context(with_ha, message):
+    assert not with_ha._needs_ha_context(message)
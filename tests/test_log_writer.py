@@ -0,0 +1,85 @@
+"""
+Tests for ConversationLogWriter
+"""
+import asyncio
+
+import pytest
+
+from backend.services import log_writer
+from backend.services.log_writer import ConversationLogWriter
+
+
+@pytest.fixture
+def written(monkeypatch):
+    """Capture inserted batches instead of writing to the database"""
+    batches = []
+    monkeypatch.setattr(ConversationLogWriter, "_insert", staticmethod(lambda rows: batches.append(list(rows))))
+    monkeypatch.setattr(log_writer, "_BATCH_INTERVAL", 0)
+    return batches
+
+
+def _chats(batches):
+    return [row["chat_id"] for batch in batches for row in batch]
+
+
+def test_batches_rows_and_flushes_on_stop(written):
+    async def run():
+        writer = ConversationLogWriter()
+        writer.start()
+        for i in range(3):
+            writer.enqueue(str(i), "soru", "cevap", "ollama")
+        await asyncio.sleep(0.05)
+        writer.enqueue("3", "soru", "cevap", "ollama")
+        await writer.stop()
+    
+    asyncio.run(run())
+    
+    assert _chats(written) == ["0", "1", "2", "3"]
+    assert written[0][0]["llm_provider"] == "ollama"
+
+
+def test_stop_writes_rows_still_queued(written, monkeypatch):
+    monkeypatch.setattr(log_writer, "_BATCH_INTERVAL", 60)
+    
+    async def run():
+        writer = ConversationLogWriter()
+        writer.start()
+        writer.enqueue("1", "a", "b", None)
+        writer.enqueue("2", "a", "b", None)
+        await asyncio.sleep(0)
+        await writer.stop()
+    
+    asyncio.run(run())
+    
+    assert _chats(written) == ["1", "2"]
+
+
+def test_enqueue_after_stop_is_dropped_without_restarting(written):
+    async def run():
+        writer = ConversationLogWriter()
+        writer.start()
+        await writer.stop()
+        writer.enqueue("late", "a", "b", None)
+        await asyncio.sleep(0.05)
+        assert writer._task is None
+        await writer.stop()
+        
+        # start() accepts rows again (bot restart)
+        writer.start()
+        writer.enqueue("again", "a", "b", None)
+        await writer.stop()
+    
+    asyncio.run(run())
+    
+    assert _chats(written) == ["again"]
+
+
+def test_enqueue_before_start_is_dropped(written):
+    async def run():
+        writer = ConversationLogWriter()
+        writer.enqueue("early", "a", "b", None)
+        await writer.stop()
+    
+    asyncio.run(run())
+    
+    assert written == []
@@ -0,0 +1,78 @@
+"""
+Tests for telling permanent errors from transient ones on the LLM and Telegram send paths
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from telegram.error import BadRequest, Forbidden, NetworkError, TimedOut
+
+from backend.services.telegram_bot import _is_transient_error
+from backend.utils import retry
+
+
+def _status_error(status):
+    request = httpx.Request("POST", "http://ollama.local/api/chat")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+class _APIStatusError(Exception):
+    """Stand-in for openai.APIStatusError"""
+    
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("exc, transient", [
+    (_status_error(401), False),
+    (_status_error(404), False),
+    (_APIStatusError(403), False),
+    (_status_error(429), True),
+    (_status_error(503), True),
+    (_APIStatusError(500), True),
+    (httpx.ConnectError("refused"), True),
+    (ValueError("bad json"), False),
+])
+def test_client_errors_are_permanent_except_429(exc, transient):
+    assert _is_transient_error(exc) is transient
+
+
+class _Chat:
+    id = 1
+    
+    def __init__(self, error):
+        self.error = error
+        self.attempts = 0
+    
+    async def send_message(self, text):
+        self.attempts += 1
+        raise self.error
+
+
+@pytest.fixture
+def no_sleep(bot_service, monkeypatch):
+    """Skip retry backoff sleeps and outbound spacing"""
+    async def sleep(seconds):
+        pass
+    
+    async def acquire(chat_id):
+        pass
+    
+    monkeypatch.setattr(retry, "asyncio", SimpleNamespace(sleep=sleep, get_running_loop=asyncio.get_running_loop))
+    bot_service.send_limiter = SimpleNamespace(acquire=acquire)
+
+
+@pytest.mark.parametrize("error, attempts", [
+    (BadRequest("Message is too long"), 1),
+    (Forbidden("bot was blocked by the user"), 1),
+    (TimedOut(), 3),
+    (NetworkError("connection reset"), 3),
+])
+def test_send_retries_only_transient_errors(bot_service, no_sleep, error, attempts):
+    chat = _Chat(error)
+    
+    with pytest.raises(type(error)):
+        asyncio.run(bot_service._send(chat, "merhaba"))
+    assert chat.attempts == attempts
@@ -0,0 +1,77 @@
+"""
+Tests for narrowing the prompt entity list to entities named in the message
+"""
+import asyncio
+
+import pytest
+
+
+@pytest.fixture
+def home(bot_service, entity_cache, make_entity):
+    bot_service.ha_client = object()
+    entity_cache.set([
+        make_entity("light.salon", "Salon Işıkları"),
+        make_entity("light.yatak_odasi", "Yatak Odası Lambası"),
+        make_entity("climate.oda", "Klima", "cool"),
+        make_entity("switch.kombi", "Kombi"),
+        make_entity("light.mutfak", "Mutfak Işık"),
+        make_entity("sensor.dis_sicaklik", "Dış Sıcaklık", "12", "°C"),
+    ])
+    return bot_service
+
+
+def _entity_list(service, message):
+    return asyncio.run(service._get_enhanced_entity_list(message))
+
+
+@pytest.mark.parametrize("message, expected, unexpected", [
+    ("Salon ışıklarını aç ve kombiyi kapat", ["light.salon", "switch.kombi"], ["climate.oda"]),
+    ("Yatak odası lambasını ve klimayı kapat", ["light.yatak_odasi", "climate.oda"], ["switch.kombi"]),
+    ("mutfağın ışığını yak", ["light.mutfak"], ["switch.kombi"]),
+])
+def test_suffixed_entity_words_are_matched(home, message, expected, unexpected):
+    entity_list = _entity_list(home, message)
+    
+    for entity_id in expected:
+        assert entity_id in entity_list
+    for entity_id in unexpected:
+        assert entity_id not in entity_list
+    assert "entity daha" in entity_list
+
+
+def test_unknown_word_falls_back_to_full_list(home):
+    entity_list = _entity_list(home, "salon ve garaj kapısını kapat")
+    
+    for entity_id in ("light.salon", "climate.oda", "switch.kombi", "sensor.dis_sicaklik"):
+        assert entity_id in entity_list
+
+
+@pytest.mark.parametrize("message", [
+    "salon thermostat set",
+    "salon settings please",
+])
+def test_ignored_word_does_not_swallow_longer_entity_word(home, message):
+    # thermostat/settings name no cached entity, so the full list is used, not just light.salon
+    entity_list = _entity_list(home, message)
+    
+    for entity_id in ("light.salon", "climate.oda", "switch.kombi"):
+        assert entity_id in entity_list
+
+
+@pytest.mark.parametrize("message", [
+    "kombiyi kapatır mısın",
+    "kombiyi açabilir misin",
+    "kombinin durumunu göster",
+])
+def test_inflected_verbs_keep_the_list_narrow(home, message):
+    entity_list = _entity_list(home, message)
+    
+    assert "switch.kombi" in entity_list
+    assert "light.salon" not in entity_list
+
+
+def test_suffixed_entity_word_counts_as_mention(entity_cache, make_entity):
+    entity_cache.set([make_entity("switch.kombi", "Kombi")])
+    
+    assert entity_cache.mentions_entity("kombiyi kapat")
+    assert not entity_cache.mentions_entity("bugün hava güzel")
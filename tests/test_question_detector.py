@@ -0,0 +1,57 @@
+"""
+Tests for QuestionDetector
+"""
+import pytest
+
+from backend.utils.question_detector import QuestionDetector
+
+# (message, is_question, is_state_query) as classified by the original per-word/per-pattern loops
+BASELINE_CASES = [
+    ("salon ışığı açık mı", True, True),
+    ("salon sıcaklığı kaç derece", True, True),
+    ("ışığı aç", False, False),
+    ("merhaba nasılsın", True, False),
+    ("durum nedir", True, True),
+    ("hello there", False, False),
+    ("mutfak lambasını kapat", False, False),
+    ("kombi state", False, True),
+    ("değeri ne", True, True),
+    ("neden böyle?", True, False),
+    ("kapı kapalı mı", True, True),
+    ("nem ne kadar", True, True),
+    ("hangi ışıklar yanıyor", True, False),
+    ("kim geldi", True, False),
+    ("bugün hava güzel", False, False),
+    ("Salon Işığı açık mı", True, True),
+    ("Kombi çalışıyor mu", True, True),
+    ("akşam yemeği", False, False),
+    ("genel durum", True, True),
+    ("perde var mı", True, False),
+    ("Sıcaklık Kaç Derece", True, True),
+]
+
+
+@pytest.mark.parametrize("message, is_question, is_state_query", BASELINE_CASES)
+def test_classification_matches_baseline(message, is_question, is_state_query):
+    assert QuestionDetector.classify(message) == (is_question, is_state_query)
+    assert QuestionDetector.is_question(message) == is_question
+    assert QuestionDetector.is_state_query(message) == is_state_query
+    assert QuestionDetector.requires_state_read(message) == (is_question and is_state_query)
+
+
+# Uppercase Turkish: "I" is dotless ı and "İ" is dotted i, unlike str.lower()
+UPPERCASE_CASES = [
+    ("AÇIK MI", True, True),
+    ("ÇALIŞIYOR MU", True, True),
+    ("KİM GELDİ", True, False),
+    ("SICAKLIK KAÇ DERECE", True, True),
+    ("DEĞERİ NE", True, True),
+    ("IŞIĞI AÇ", False, False),
+]
+
+
+@pytest.mark.parametrize("message, is_question, is_state_query", UPPERCASE_CASES)
+def test_uppercase_turkish_is_classified_like_lowercase(message, is_question, is_state_query):
+    assert QuestionDetector.classify(message) == (is_question, is_state_query)
+    assert QuestionDetector.is_question(message) == is_question
+    assert QuestionDetector.is_state_query(message) == is_state_query
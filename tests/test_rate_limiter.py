@@ -0,0 +1,141 @@
+"""
+Tests for RateLimiter (sliding window counter) and OutboundLimiter
+"""
+import asyncio
+import heapq
+from types import SimpleNamespace
+
+import pytest
+
+from backend.utils import rate_limiter
+from backend.utils.rate_limiter import OutboundLimiter, RateLimiter
+
+
+def _fill(limiter, count):
+    for _ in range(count):
+        assert limiter.check("chat")[0]
+
+
+def test_allows_up_to_limit_then_refuses(clock):
+    limiter = RateLimiter(max_requests=3, time_window=60)
+    _fill(limiter, 3)
+    
+    allowed, wait = limiter.check("chat")
+    
+    assert not allowed
+    assert wait > 0
+    assert limiter.get_remaining("chat") == 0
+
+
+def test_suggested_wait_is_enough_when_window_is_full(clock):
+    limiter = RateLimiter(max_requests=3, time_window=60)
+    _fill(limiter, 3)
+    _, wait = limiter.check("chat")
+    
+    clock.now += wait - 0.01
+    assert not limiter.check("chat")[0]
+    
+    clock.now += 0.01
+    assert limiter.check("chat")[0]
+
+
+def test_suggested_wait_is_enough_while_previous_window_decays(clock):
+    limiter = RateLimiter(max_requests=3, time_window=60)
+    _fill(limiter, 3)
+    clock.now += 90  # halfway into the next window: previous 3 requests weigh 1.5
+    _fill(limiter, 2)
+    allowed, wait = limiter.check("chat")
+    assert not allowed
+    
+    clock.now += wait - 0.01
+    assert not limiter.check("chat")[0]
+    
+    clock.now += 0.01
+    assert limiter.check("chat")[0]
+
+
+def test_refused_requests_are_not_counted(clock):
+    limiter = RateLimiter(max_requests=2, time_window=60)
+    _fill(limiter, 2)
+    for _ in range(5):
+        assert not limiter.check("chat")[0]
+    
+    clock.now += 120  # both windows stale
+    _fill(limiter, 2)
+
+
+def test_chats_are_limited_independently(clock):
+    limiter = RateLimiter(max_requests=1, time_window=60)
+    
+    assert limiter.check("a")[0]
+    assert limiter.check("b")[0]
+    assert not limiter.check("a")[0]
+
+
+class _FakeTime:
+    """Virtual clock whose sleeps resume in wake-time order once every task is blocked"""
+    
+    def __init__(self):
+        self.now = 100.0
+        self._sleepers = []
+        self._seq = 0
+    
+    def monotonic(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self.now + seconds, self._seq, future))
+        self._seq += 1
+        await future
+    
+    async def run(self, *coros):
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        while True:
+            for _ in range(10):
+                await asyncio.sleep(0)
+            if all(task.done() for task in tasks):
+                return [task.result() for task in tasks]
+            wake_at, _, future = heapq.heappop(self._sleepers)
+            self.now = max(self.now, wake_at)
+            future.set_result(None)
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    """Fake clock and sleep for OutboundLimiter"""
+    fake = _FakeTime()
+    monkeypatch.setattr(rate_limiter, "time", fake)
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(sleep=fake.sleep))
+    return fake
+
+
+def _send_times(fake_time, limiter, chat_ids):
+    """Acquire concurrently for each chat (in call order) and return (chat_id, send time) by send time"""
+    sent = []
+    
+    async def send(chat_id):
+        await limiter.acquire(chat_id)
+        sent.append((chat_id, fake_time.now))
+    
+    asyncio.run(fake_time.run(*(send(chat_id) for chat_id in chat_ids)))
+    return sent
+
+
+def test_outbound_sends_to_one_chat_are_spaced(fake_time):
+    limiter = OutboundLimiter(global_rate=1000, per_chat_interval=1.0)
+    
+    assert _send_times(fake_time, limiter, ["a", "a", "a"]) == [("a", 100.0), ("a", 101.0), ("a", 102.0)]
+
+
+def test_outbound_sends_across_chats_respect_global_rate(fake_time):
+    limiter = OutboundLimiter(global_rate=2, per_chat_interval=1.0)
+    
+    assert _send_times(fake_time, limiter, ["a", "b", "c"]) == [("a", 100.0), ("b", 100.5), ("c", 101.0)]
+
+
+def test_chat_waiting_its_turn_does_not_hold_a_global_slot(fake_time):
+    limiter = OutboundLimiter(global_rate=1, per_chat_interval=1.0)
+    
+    # The second "a" waits for its chat slot, so "b" takes the next global slot first
+    assert _send_times(fake_time, limiter, ["a", "a", "b"]) == [("a", 100.0), ("b", 101.0), ("a", 102.0)]
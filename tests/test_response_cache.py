@@ -0,0 +1,109 @@
+"""
+Tests for ResponseCache and its use in handle_message
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.response_cache import ResponseCache, get_response_cache
+from backend.services.telegram_bot import invalidate_settings
+
+
+def test_lookup_ignores_case_and_whitespace(clock):
+    cache = ResponseCache()
+    cache.put("1", "Merhaba  Nasılsın", "İyiyim", "ollama")
+    
+    assert cache.get("1", "  merhaba nasılsın ") == ("İyiyim", "ollama")
+    assert cache.get("2", "merhaba nasılsın") is None
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("1", "selam", "selam!")
+    
+    clock.now += 59
+    assert cache.get("1", "selam") == ("selam!", None)
+    clock.now += 1
+    assert cache.get("1", "selam") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_size=2)
+    cache.put("1", "a", "A")
+    cache.put("1", "b", "B")
+    cache.get("1", "a")
+    cache.put("1", "c", "C")
+    
+    assert cache.get("1", "a") == ("A", None)
+    assert cache.get("1", "b") is None
+    assert cache.get("1", "c") == ("C", None)
+
+
+class _Chat:
+    id = 1
+    type = "private"
+    
+    def __init__(self):
+        self.sent = []
+    
+    async def send_message(self, text):
+        self.sent.append(text)
+
+
+class _Provider:
+    name = "fake"
+    
+    def __init__(self, reply):
+        self.reply = reply
+    
+    async def generate(self, message, system_prompt):
+        return self.reply
+
+
+def _handle(service, provider, text):
+    async def settings():
+        return None, provider
+    
+    async def acquire(chat_id):
+        pass
+    
+    service._get_ha_and_provider = settings
+    service.send_limiter = SimpleNamespace(acquire=acquire)
+    chat = _Chat()
+    update = SimpleNamespace(effective_chat=chat, message=SimpleNamespace(text=text))
+    asyncio.run(service.handle_message(update, SimpleNamespace(bot=None)))
+    return chat.sent
+
+
+@pytest.mark.parametrize("reply, cached", [
+    ("Merhaba!", True),
+    ('Tamam HA_COMMAND: {"type": "service"', False),
+])
+def test_handle_message_skips_caching_malformed_ha_commands(bot_service, reply, cached):
+    bot_service.response_cache = ResponseCache()
+    
+    assert _handle(bot_service, _Provider(reply), "selam") == [reply]
+    assert (bot_service.response_cache.get("1", "selam") == (reply, "fake")) is cached
+
+
+def test_cache_hit_is_logged_with_the_provider_that_answered(bot_service, monkeypatch):
+    bot_service.response_cache = ResponseCache()
+    logged = []
+    monkeypatch.setattr(bot_service.log_writer, "enqueue", lambda *row: logged.append(row))
+    _handle(bot_service, _Provider("Merhaba!"), "selam")
+    
+    other = _Provider("Selam!")
+    other.name = "other"
+    
+    assert _handle(bot_service, other, "selam") == ["Merhaba!"]
+    assert [row[3] for row in logged] == ["fake", "fake"]
+
+
+def test_invalidate_settings_clears_cached_replies():
+    cache = get_response_cache()
+    cache.put("1", "selam", "Merhaba!", "ollama")
+    
+    invalidate_settings()
+    
+    assert cache.get("1", "selam") is None
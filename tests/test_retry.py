@@ -0,0 +1,78 @@
+"""
+Tests for retry_async
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.utils import retry
+from backend.utils.retry import retry_async
+
+
+class _RetryAfter(Exception):
+    """Stand-in for telegram.error.RetryAfter"""
+    
+    def __init__(self, seconds):
+        super().__init__(f"retry after {seconds}")
+        self.retry_after = seconds
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """Record sleeps instead of waiting, without jitter"""
+    recorded = []
+    
+    async def sleep(seconds):
+        recorded.append(seconds)
+    
+    monkeypatch.setattr(retry, "asyncio", SimpleNamespace(sleep=sleep, get_running_loop=asyncio.get_running_loop))
+    monkeypatch.setattr(retry, "random", SimpleNamespace(uniform=lambda low, high: 0.0))
+    return recorded
+
+
+def _flaky(*errors):
+    """Async function raising the given errors in turn, then returning "ok" """
+    calls = []
+    
+    async def func():
+        calls.append(None)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    
+    func.calls = calls
+    return func
+
+
+def test_retry_after_hint_is_waited(waits):
+    func = _flaky(_RetryAfter(5))
+    
+    assert asyncio.run(retry_async(func, max_delay=15)) == "ok"
+    assert waits == [5.0]
+
+
+def test_retry_after_over_max_delay_fails_fast(waits):
+    func = _flaky(_RetryAfter(120))
+    
+    with pytest.raises(_RetryAfter):
+        asyncio.run(retry_async(func, max_delay=15))
+    assert waits == []
+    assert len(func.calls) == 1
+
+
+def test_retry_on_false_raises_immediately(waits):
+    func = _flaky(ValueError("permanent"))
+    
+    with pytest.raises(ValueError):
+        asyncio.run(retry_async(func, retry_on=lambda exc: not isinstance(exc, ValueError)))
+    assert len(func.calls) == 1
+
+
+def test_last_error_raised_after_all_retries(waits):
+    func = _flaky(*[ConnectionError("down")] * 3)
+    
+    with pytest.raises(ConnectionError):
+        asyncio.run(retry_async(func, max_retries=2))
+    assert len(func.calls) == 3
+    assert len(waits) == 2
@@ -0,0 +1,52 @@
+"""
+Tests for reusing loaded HA settings and LLM provider across messages
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import telegram_bot
+from backend.services.telegram_bot import invalidate_settings
+
+
+@pytest.fixture
+def loads(bot_service, monkeypatch):
+    """Replace the DB load with a counter; returns the list of load results"""
+    results = []
+    
+    def load():
+        results.append((("http://ha.local", "token", False), SimpleNamespace(name=f"provider{len(results)}")))
+        return results[-1]
+    
+    monkeypatch.setattr(bot_service, "_load_ha_and_provider", load)
+    return results
+
+
+def _get(service):
+    return asyncio.run(service._get_ha_and_provider())
+
+
+def test_settings_are_reused_within_ttl(bot_service, loads, clock):
+    first = _get(bot_service)
+    clock.now += telegram_bot._SETTINGS_TTL - 1
+    
+    assert _get(bot_service) == first
+    assert len(loads) == 1
+
+
+def test_settings_reload_after_ttl(bot_service, loads, clock):
+    _get(bot_service)
+    clock.now += telegram_bot._SETTINGS_TTL
+    
+    assert _get(bot_service)[1].name == "provider1"
+    assert len(loads) == 2
+
+
+def test_settings_reload_after_invalidation(bot_service, loads, clock):
+    _get(bot_service)
+    invalidate_settings()
+    
+    assert _get(bot_service)[1].name == "provider1"
+    assert _get(bot_service)[1].name == "provider1"
+    assert len(loads) == 2
@@ -0,0 +1,59 @@
+"""
+Tests for the module-level start_bot accessor
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import telegram_bot
+
+
+class _FakeBot:
+    started = []
+    
+    def __init__(self, config):
+        self.config = config
+    
+    async def start(self):
+        _FakeBot.started.append(self)
+        return self.config.bot_token != "bad"
+
+
+@pytest.fixture
+def fake_bot(monkeypatch):
+    """Replace the bot service and config loader, starting from no bot instance and a fresh lock"""
+    config = SimpleNamespace(bot_token="123:test", enabled=True)
+    _FakeBot.started = []
+    monkeypatch.setattr(telegram_bot, "TelegramBotService", _FakeBot)
+    monkeypatch.setattr(telegram_bot, "load_telegram_config", lambda: config)
+    monkeypatch.setattr(telegram_bot, "_bot_instance", None)
+    monkeypatch.setattr(telegram_bot, "_bot_lock", asyncio.Lock())
+    return config
+
+
+def _start_twice():
+    async def run():
+        return await asyncio.gather(telegram_bot.start_bot("t"), telegram_bot.start_bot("t"))
+    return asyncio.run(run())
+
+
+def test_concurrent_starts_create_one_bot(fake_bot):
+    assert _start_twice() == [True, True]
+    assert len(_FakeBot.started) == 1
+    assert telegram_bot._bot_instance is _FakeBot.started[0]
+
+
+def test_failed_start_keeps_no_instance(fake_bot):
+    fake_bot.bot_token = "bad"
+    
+    assert _start_twice() == [False, False]
+    assert len(_FakeBot.started) == 2
+    assert telegram_bot._bot_instance is None
+
+
+def test_disabled_config_returns_false(fake_bot):
+    fake_bot.enabled = False
+    
+    assert asyncio.run(telegram_bot.start_bot("t")) is False
+    assert _FakeBot.started == []
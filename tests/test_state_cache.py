@@ -0,0 +1,58 @@
+"""
+Tests for answering get_state from the entity cache
+"""
+import asyncio
+
+
+class FakeHAClient:
+    """Records calls; call_service turns the light on"""
+    
+    def __init__(self, make_entity):
+        self.make_entity = make_entity
+        self.state = "off"
+        self.get_states_calls = 0
+    
+    async def call_service(self, domain, service, entity_id, data=None):
+        self.state = "on"
+        return []
+    
+    async def get_states(self, entity_id=None):
+        self.get_states_calls += 1
+        return [self.make_entity("light.salon", "Salon Işığı", self.state)]
+
+
+def _run(service, command):
+    return asyncio.run(service._execute_ha_command_generic(command, "", dry_run=False))
+
+
+def test_fresh_cache_answers_get_state(bot_service, entity_cache, make_entity):
+    bot_service.ha_client = FakeHAClient(make_entity)
+    entity_cache.set([make_entity("light.salon", "Salon Işığı", "off")])
+    
+    response, success_count, _ = _run(bot_service, {"type": "get_state", "entity_id": "light.salon"})
+    
+    assert success_count == 1
+    assert "off" in response
+    assert bot_service.ha_client.get_states_calls == 0
+
+
+def test_get_state_after_service_call_asks_home_assistant(bot_service, entity_cache, make_entity):
+    bot_service.ha_client = FakeHAClient(make_entity)
+    entity_cache.set([make_entity("light.salon", "Salon Işığı", "off")])
+    
+    _run(bot_service, {"type": "service", "domain": "light", "service": "turn_on", "entity_id": "light.salon", "data": {}})
+    response, success_count, _ = _run(bot_service, {"type": "get_state", "entity_id": "light.salon"})
+    
+    assert success_count == 1
+    assert "on" in response and "off" not in response
+    assert bot_service.ha_client.get_states_calls == 1
+
+
+def test_cache_refresh_makes_states_usable_again(entity_cache, make_entity):
+    entity_cache.set([make_entity("light.salon", state="off")])
+    entity_cache.invalidate_states()
+    assert entity_cache.get_entity("light.salon", max_age=10) is None
+    assert entity_cache.get_entity("light.salon") is not None
+    
+    entity_cache.set([make_entity("light.salon", state="on")])
+    assert entity_cache.get_entity("light.salon", max_age=10)["state"] == "on"
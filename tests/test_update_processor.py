@@ -0,0 +1,46 @@
+"""
+Tests for per-chat ordering of concurrently processed updates
+"""
+import asyncio
+from datetime import datetime
+
+from telegram import Chat, Message, Update
+
+from backend.services.telegram_bot import _ChatSerialUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(id=chat_id, type=Chat.PRIVATE)
+    return Update(update_id=update_id, message=Message(message_id=update_id, date=datetime.now(), chat=chat, text="x"))
+
+
+def _process_all(updates, delays):
+    """Process updates like the Application does (one task each, in order), recording start/end events"""
+    events = []
+    
+    async def handler(update_id):
+        events.append(("start", update_id))
+        await asyncio.sleep(delays[update_id])
+        events.append(("end", update_id))
+    
+    async def main():
+        processor = _ChatSerialUpdateProcessor(16)
+        tasks = [asyncio.create_task(processor.process_update(u, handler(u.update_id))) for u in updates]
+        await asyncio.gather(*tasks)
+        return processor
+    
+    processor = asyncio.run(main())
+    return events, processor
+
+
+def test_same_chat_updates_run_one_at_a_time_in_order():
+    events, processor = _process_all([_update(1, 10), _update(2, 10), _update(3, 10)], {1: 0.03, 2: 0.0, 3: 0.01})
+    
+    assert events == [("start", 1), ("end", 1), ("start", 2), ("end", 2), ("start", 3), ("end", 3)]
+    assert processor._chat_locks == {}
+
+
+def test_different_chats_run_concurrently():
+    events, _ = _process_all([_update(1, 10), _update(2, 20)], {1: 0.03, 2: 0.0})
+    
+    assert events.index(("end", 2)) < events.index(("end", 1))